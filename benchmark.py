@@ -0,0 +1,352 @@
+"""
+Benchmarks of truthtable.py, covering table creation, row access, rendering,
+sums of products, merging, reordering and equivalence, for tables of 4 to 22
+variables and expressions of tens to 100,000 characters.
+
+Every expression is generated from a fixed seed, so results of different runs
+(and different versions of truthtable.py) are directly comparable. Results are
+written as JSON, and may be compared against the results of an earlier run.
+Features absent from older versions of truthtable.py (the expression cache
+and backends) are skipped, such that a baseline may be taken from any version.
+
+Usage:
+    python benchmark.py [--quick] [--backend BACKEND] [--output FILE]
+                        [--baseline FILE] [--threshold RATIO]
+
+e.g.
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+import truthtable
+from truthtable import TruthTable
+
+# Version of format of results
+FORMAT_VERSION = 1
+# Variable counts of tables of each benchmark, full and quick
+VARIABLES = (4, 8, 12, 16, 20, 22)
+QUICK_VARIABLES = (4, 8, 12, 16)
+# Approximate lengths of long expressions, full and quick
+LENGTHS = (100, 1000, 10000, 100000)
+QUICK_LENGTHS = (100, 1000, 10000)
+# Number of variables of long expressions
+LENGTH_VARIABLES = 8
+# Maximum number of variables of tables rendered in full or summed, of which
+# the text grows with the number of rows
+MAX_RENDER_VARIABLES = 16
+MAX_SOP_VARIABLES = 16
+# Number of rows of which the output or text is retrieved by each benchmark
+ROW_CALLS = 1000
+# Seed of all generated expressions and inputs
+SEED = 2020
+
+
+def generate_expression(rng, variables, leaves):
+    """
+    Returns a random expression of the given variables, being a balanced tree
+    of subexpressions of two operands and one operator. Every variable occurs at
+    least once, and operands are negated at random (but never twice in
+    succession).
+
+    Arguments:
+        rng (random.Random): source of randomness
+        variables (list[str]): variables of expression
+        leaves (int): number of occurrences of variables in expression, being
+            at least the number of variables
+
+    Returns (str): expression
+    """
+    operands = list(variables) + [rng.choice(variables) for _ in range(leaves)]
+    operands = operands[: max(leaves, len(variables))]
+    rng.shuffle(operands)
+    operands = [("!" if rng.random() < 0.25 else "") + x for x in operands]
+    while len(operands) > 1:
+        pairs = []
+        for i in range(0, len(operands) - 1, 2):
+            operator = rng.choice(".+^")
+            # Older versions of truthtable.py reject a negator followed by
+            # another, ignoring brackets (e.g. '!(!A.B)')
+            negator = "!" if rng.random() < 0.1 else ""
+            if operands[i].lstrip("(").startswith("!"):
+                negator = ""
+            pairs.append(f"{negator}({operands[i]}{operator}{operands[i + 1]})")
+        if len(operands) % 2:
+            pairs.append(operands[-1])
+        operands = pairs
+    return operands[0]
+
+
+def expression_of_length(rng, variables, length):
+    """
+    Returns a random expression of the given variables of approximately the
+    given length.
+
+    Arguments:
+        rng (random.Random): source of randomness
+        variables (list[str]): variables of expression
+        length (int): approximate length of expression
+
+    Returns (str): expression
+    """
+    # Each occurrence of a variable contributes roughly 4.5 characters
+    leaves = max(len(variables), round(length / 4.5))
+    return generate_expression(rng, variables, leaves)
+
+
+def variable_names(count):
+    """
+    Returns (list[str]): the first count uppercase letters
+    """
+    return list(string.ascii_uppercase[:count])
+
+
+def measure(setup, repeat):
+    """
+    Times the function returned by the given setup function, returning the best
+    of the given number of runs and the peak memory allocated by a further run.
+    The setup is repeated before each run and is not timed.
+
+    Arguments:
+        setup (callable): returns the function to be measured
+        repeat (int): number of timed runs
+
+    Returns (dict): time of fastest run in seconds, and peak memory in bytes
+    """
+    times = []
+    for _ in range(repeat):
+        function = setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    function = setup()
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "peak_bytes": peak}
+
+
+def clear_cache():
+    """
+    Clears the expression cache, if this version of truthtable.py has one.
+    """
+    cache = getattr(truthtable, "expression_cache", None)
+    if cache is not None:
+        cache.clear()
+
+
+def cold(function):
+    """
+    Returns a setup function returning the given function after clearing the
+    expression cache, so that tables are created from scratch.
+    """
+
+    def setup():
+        clear_cache()
+        return function
+
+    return setup
+
+
+def benchmarks(variable_counts, lengths):
+    """
+    Yields each benchmark as a tuple of its name, number of variables, length of
+    expression, number of calls and setup function.
+
+    Arguments:
+        variable_counts (tuple[int]): variable counts of tables
+        lengths (tuple[int]): approximate lengths of long expressions
+
+    Returns (generator[tuple]): benchmarks
+    """
+    rng = random.Random(SEED)
+    for count in variable_counts:
+        variables = variable_names(count)
+        expression = generate_expression(rng, variables, 2 * count)
+        other = generate_expression(rng, variables, 2 * count)
+        length = len(expression)
+        table = TruthTable(expression)
+        inputs = [
+            "".join(rng.choice("01") for _ in range(count)) for _ in range(ROW_CALLS)
+        ]
+        rows = [rng.randrange(2**count) for _ in range(ROW_CALLS)]
+
+        yield "init", count, length, 1, cold(lambda: TruthTable(expression))
+        yield "get_output", count, length, ROW_CALLS, lambda: (
+            lambda: [table.get_output(x) for x in inputs]
+        )
+        yield "get_row", count, length, ROW_CALLS, lambda: (
+            lambda: [table.get_row(x) for x in rows]
+        )
+        if count <= MAX_RENDER_VARIABLES:
+            yield "str", count, length, 1, lambda: (lambda: str(table))
+        if count <= MAX_SOP_VARIABLES:
+            yield "sum_of_products", count, length, 1, lambda: table.sum_of_products
+
+        # Merged tables of half the variables each, of which the result has
+        # the given number of variables
+        halves = [
+            TruthTable(generate_expression(rng, variable_names(count // 2), count))
+            for _ in range(2)
+        ]
+        yield "merge", count, length, 1, cold(
+            lambda: halves[0].merged(halves[1], "+", True)
+        )
+
+        ordering = list(reversed(table.variables))
+
+        def reorder():
+            clear_cache()
+            copy = TruthTable(table.expression)
+            clear_cache()
+            return lambda: copy.set_ordering(ordering)
+
+        yield "set_ordering", count, length, 1, reorder
+        yield "equivalent", count, length, 1, cold(lambda: table.equivalent(other))
+
+    for length in lengths:
+        variables = variable_names(LENGTH_VARIABLES)
+        expression = expression_of_length(rng, variables, length)
+        yield "init", LENGTH_VARIABLES, len(expression), 1, cold(
+            lambda: TruthTable(expression)
+        )
+
+
+def run(variable_counts, lengths, repeat, log=None):
+    """
+    Runs every benchmark.
+
+    Arguments:
+        variable_counts (tuple[int]): variable counts of tables
+        lengths (tuple[int]): approximate lengths of long expressions
+        repeat (int): number of timed runs of each benchmark
+        log (file): file to which progress is written, if any
+
+    Returns (list[dict]): result of each benchmark
+    """
+    results = []
+    for name, count, length, calls, setup in benchmarks(variable_counts, lengths):
+        result = {"name": name, "variables": count, "length": length, "calls": calls}
+        result.update(measure(setup, repeat))
+        results.append(result)
+        if log is not None:
+            log.write(
+                f"{name:>16} variables={count:<3} length={length:<7} "
+                f"{result['seconds']:.6f}s peak={result['peak_bytes']}B\n"
+            )
+            log.flush()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares the given results with those of a baseline, matching benchmarks by
+    name, number of variables and length of expression.
+
+    Arguments:
+        results (list[dict]): results of this run
+        baseline (list[dict]): results of baseline run
+        threshold (float): ratio of time to baseline time above which a
+            benchmark is considered to have regressed
+
+    Returns (list[dict]): comparison of each benchmark also in baseline, with
+        the ratio of its time to the baseline time
+    """
+    previous = {(x["name"], x["variables"], x["length"]): x for x in baseline}
+    comparisons = []
+    for result in results:
+        key = (result["name"], result["variables"], result["length"])
+        if key not in previous:
+            continue
+        before = previous[key]
+        ratio = result["seconds"] / max(before["seconds"], 1e-9)
+        comparisons.append(
+            {
+                "name": result["name"],
+                "variables": result["variables"],
+                "length": result["length"],
+                "seconds": result["seconds"],
+                "baseline_seconds": before["seconds"],
+                "ratio": ratio,
+                "peak_bytes": result["peak_bytes"],
+                "baseline_peak_bytes": before["peak_bytes"],
+                "regressed": ratio > threshold,
+            }
+        )
+    return comparisons
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark truthtable.py")
+    parser.add_argument(
+        "--quick", action="store_true", help="fewer and smaller benchmarks"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=getattr(truthtable, "BACKENDS", ("python",)),
+        default="python",
+        help="backend",
+    )
+    parser.add_argument("--repeat", type=int, default=None, help="timed runs")
+    parser.add_argument("--output", help="file to which JSON results are written")
+    parser.add_argument("--baseline", help="JSON results with which to compare")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="ratio of time to baseline time considered a regression",
+    )
+    args = parser.parse_args(argv)
+
+    if hasattr(truthtable, "set_default_backend"):
+        truthtable.set_default_backend(args.backend)
+    repeat = args.repeat or (3 if args.quick else 5)
+    variable_counts = QUICK_VARIABLES if args.quick else VARIABLES
+    lengths = QUICK_LENGTHS if args.quick else LENGTHS
+
+    report = {
+        "version": FORMAT_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "quick": args.quick,
+        "repeat": repeat,
+        "results": run(variable_counts, lengths, repeat, sys.stderr),
+    }
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            comparisons = compare(
+                report["results"], json.load(baseline)["results"], args.threshold
+            )
+        report["comparison"] = comparisons
+        for x in comparisons:
+            if x["regressed"]:
+                regressed = True
+                sys.stderr.write(
+                    f"REGRESSION {x['name']} variables={x['variables']} "
+                    f"length={x['length']}: {x['ratio']:.2f}x baseline\n"
+                )
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
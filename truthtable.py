@@ -1,13 +1,115 @@
+import csv
+import functools
+import hashlib
+import io
+import itertools
+import json
+import keyword
+import operator
+import re
 import string
+import struct
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from types import MappingProxyType
+
+# Backends with which outputs may be evaluated
+BACKENDS = ("python", "numpy", "bdd", "gray")
+# Backend used by tables for which no backend is given
+_default_backend = "python"
+# NumPy module, imported upon first use of the numpy backend
+_numpy = None
+# Pool of processes evaluating tables in parallel, created upon first use and
+# shared by all tables, its number of processes, and the lock of its creation
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+# Number of rows rendered and written at a time by TruthTable.render_to
+_RENDER_CHUNK_ROWS = 4096
+# Maximum number of variables minimised by Quine-McCluskey by default
+_QM_MAX_VARIABLES = 10
+# Characters with which variables may begin, and of which they may consist
+_IDENTIFIER_START = frozenset(string.ascii_letters + "_")
+_IDENTIFIER_CHARACTERS = frozenset(string.ascii_letters + string.digits + "_")
+# Tokens of expressions, being variables or single characters
+_TOKENS = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|.", re.DOTALL)
+# Spaces separating variables, which may not simply be removed
+_SEPARATED_VARIABLES = re.compile(r"[A-Za-z0-9_] +[A-Za-z0-9_]")
+# Minimum number of variables of tables evaluated by multiple processes
+_PARALLEL_MIN_VARIABLES = 20
+# Magic number, version and layout of the fixed-size header of saved tables,
+# being the magic number, version, and length of the metadata which follows
+_FILE_MAGIC = b"TTBL"
+_FILE_VERSION = 1
+_FILE_HEADER = struct.Struct("<4sHI")
+# Fields of the metadata of saved tables, and their types
+_FILE_FIELDS = {
+    "expression": str,
+    "variables": list,
+    "aliases": dict,
+    "operators": dict,
+    "rows": int,
+}
+# Maximum number of arrangements of variables of equal signature tried when
+# finding the canonical outputs of a table up to permutation of its variables
+_PERMUTATION_LIMIT = 40320
+# Formats of results of the command line interface
+_CLI_FORMATS = ("text", "csv", "jsonl", "binary")
+# Number of expressions read and dispatched to workers at a time by the command
+# line interface
+_CLI_BATCH_SIZE = 1024
+# Placeholder of the outputs of a record of the command line interface, which
+# are streamed in its place
+_CLI_MARKER = "\0"
+# Functions of operator names, for evaluation outside of a table
+_OPERATIONS = {"AND": operator.and_, "OR": operator.or_, "XOR": operator.xor}
+# Names of operators of the default operator symbols
+_DEFAULT_OPERATORS = {
+    ".": "AND",
+    "&": "AND",
+    "+": "OR",
+    "|": "OR",
+    "^": "XOR",
+    "#": "XOR",
+}
+
+
+def _profiled(stage):
+    """
+    Returns a decorator recording the wall time of each call of a function as
+    the given stage of the profiler, if profiling is enabled.
+
+    Arguments:
+        stage (str): name of stage
+
+    Returns (function): decorator
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.record(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
 
 
 class TruthTable:
     """
     Representation of a truth table of all possible combinations of inputs and
     outputs for a given boolean expression. Boolean expressions are composed of
-    single-character variables and operations. Expressions must be appropriately
-    divided by brackets (e.g. 'A.B.C' must be expressed as 'A.(B.C)' or
-    '(A.B).C') indicating precedence/order of operations.
+    variables (e.g. 'A', 'x12' or 'req_valid') and operations. Expressions must
+    be appropriately divided by brackets (e.g. 'A.B.C' must be expressed as
+    'A.(B.C)' or '(A.B).C') indicating precedence/order of operations.
 
     Operations:
     - AND: &, .
@@ -18,29 +120,87 @@ class TruthTable:
     Attributes:
         expression (str): boolean expression for which table is created
         variables (list[str]): variables in expression
-        outputs (list[int]): complete set of outputs of truth table
+        outputs (BitVector or numpy.ndarray): complete set of outputs of truth
+            table, being a read-only uint8 array for the numpy backend
+        backend (str): backend with which outputs are evaluated ('python',
+            'numpy' or 'bdd')
+        lazy (boolean): if true, outputs are evaluated for individual rows on
+            demand rather than for all rows upon creation
         aliases (dict[str, str]): aliases of variables to be displayed
-        operations (dict[str, lambda]): possible boolean operations and their
-            symbols
+        operations (Mapping[str, function]): possible boolean operations and
+            their symbols, being a read-only table shared by all tables with
+            the same operators
+        functions (Mapping[str, function]): function of each operator name
+            (AND, OR, or XOR), shared by all tables
     """
 
-    def __init__(self, expression):
+    # Functions of operator names, shared by all tables
+    functions = MappingProxyType(_OPERATIONS)
+    # Operator table of the default operators
+    _default_operations = MappingProxyType(
+        {symbol: _OPERATIONS[name] for symbol, name in _DEFAULT_OPERATORS.items()}
+    )
+    # Interned operator tables, keyed by the name of the operator of each
+    # symbol, such that tables with the same operators share one operator table
+    _operation_tables = {frozenset(_DEFAULT_OPERATORS.items()): _default_operations}
+
+    __slots__ = (
+        "expression",
+        "variables",
+        "backend",
+        "_outputs",
+        "aliases",
+        "operations",
+        "_program",
+        "lazy",
+        "_cache_size",
+        "_bdd_node",
+        "_workers",
+    )
+
+    def __init__(
+        self, expression, backend=None, lazy=False, cache_size=1024, workers=None
+    ):
         """
         Creates a new TruthTable using the given expression. The ouputs are
-        calculated upon creation.
+        calculated upon creation, unless the table is lazy.
 
         Arguments:
             expression (str): boolean expression for which truth table will be
                 created
+            backend (str): backend with which outputs are evaluated, being
+                'python' (big-integer column masks), 'numpy' (vectorised
+                arrays), 'bdd' (binary decision diagram, from which the
+                outputs of rows are evaluated on demand) or 'gray' (rows
+                enumerated in Gray code order, re-evaluating only the
+                subexpressions of the variable changed between consecutive
+                rows). Defaults to the
+                backend set by set_default_backend. The python backend is used
+                if NumPy is not installed.
+            lazy (boolean): if true, the expression is only validated and
+                compiled upon creation, and the outputs of rows are evaluated
+                when requested. All outputs are evaluated only when required
+                (i.e. for equality, printing and sum of products).
+            cache_size (int): maximum number of outputs of individual rows
+                memoised by a lazy table
+            workers (int): number of processes among which the rows of tables
+                of at least 20 variables are divided for evaluation, or None to
+                evaluate in this process only. The processes are shared by all
+                tables and started upon first use. Ignored by lazy tables and
+                by the bdd and gray backends, which evaluate in this process
         """
         if expression is None:
             raise TypeError("Expression cannot be None")
         self.expression = ""
         self.variables = []
-        self.outputs = []
+        self.backend = _resolve_backend(backend)
+        self.lazy = lazy
+        self._cache_size = cache_size
+        self._workers = workers
+        self._bdd_node = None
+        self._outputs = BitVector(b"", 0)
         self.aliases = {}
-        self.operations = {}
-        self.functions = {}
+        self._program = []
         self._initialise_operations()
         self.set_expression(expression)
 
@@ -83,7 +243,294 @@ class TruthTable:
         ):
             return -1
         row = int(inputs, base=2)
-        return self.outputs[row]
+        return self._output(row)
+
+    def get_outputs(self, batch):
+        """
+        Returns outputs of boolean expression for each of the given inputs.
+        Invalid inputs do not raise an error, but are reported by the returned
+        mask of valid inputs.
+
+        e.g. For expression=A.B, batch=['11', '01', '2'] returns ([1, 0, -1],
+        [1, 1, 0]), as does batch=[3, 1, 4]. Inputs which are neither strings
+        nor integers (e.g. 1.5 or None) are invalid.
+
+        Arguments:
+            batch (iterable[str], iterable[int] or numpy.ndarray): inputs, each
+                being a string of bits as for get_output or the index of a row.
+                A buffer (e.g. array.array) or 1-dimensional NumPy array of row
+                indices, or a 2-dimensional NumPy array of which each row is the
+                bits of an input, may also be given.
+
+        Returns (tuple[list[int], BitVector] or tuple[numpy.ndarray,
+            numpy.ndarray]): output of each input, or -1 if invalid, and mask
+            of valid inputs. For NumPy arrays, these are an int8 array and a
+            bool array respectively.
+        """
+        if type(batch).__name__ == "ndarray" and _import_numpy() is not None:
+            if batch.dtype.kind in "iub":
+                return self._get_array_outputs(batch)
+            if batch.dtype.kind in "fc":
+                # Row indices and bits must be integers
+                return (
+                    _numpy.full(len(batch), -1, dtype=_numpy.int8),
+                    _numpy.zeros(len(batch), dtype=bool),
+                )
+            batch = batch.tolist()
+        elif not isinstance(batch, (list, tuple, str)):
+            try:
+                batch = memoryview(batch).tolist()
+            except TypeError:
+                pass
+
+        width = len(self.variables)
+        rows = 2**width
+        outputs = self._outputs
+        if isinstance(outputs, BitVector):
+            # Read packed outputs directly rather than through indexing
+            data = outputs.data
+            output = lambda row: (data[row >> 3] >> (row & 7)) & 1
+        else:
+            output = lambda row: int(outputs[row])
+        results = []
+        valid = []
+        for x in batch:
+            if x.__class__ is int:
+                row = x
+            elif x.__class__ is str:
+                row = int(x, base=2) if len(x) == width and not x.strip("01") else -1
+            else:
+                try:
+                    row = operator.index(x)
+                except TypeError:
+                    row = -1
+            if 0 <= row < rows:
+                results.append(output(row))
+                valid.append(1)
+            else:
+                results.append(-1)
+                valid.append(0)
+        return results, BitVector.from_bits(valid)
+
+    def _get_array_outputs(self, batch):
+        """
+        Returns outputs of boolean expression for each of the inputs of the
+        given NumPy array, as for get_outputs.
+
+        Arguments:
+            batch (numpy.ndarray): 1-dimensional array of row indices, or
+                2-dimensional array of which each row is the bits of an input
+
+        Returns (tuple[numpy.ndarray, numpy.ndarray]): int8 array of output of
+            each input, or -1 if invalid, and bool array of valid inputs
+        """
+        np = _numpy
+        width = len(self.variables)
+        if batch.ndim == 2:
+            valid = (batch.shape[1] == width) & np.all(
+                (batch == 0) | (batch == 1), axis=1
+            )
+            weights = 1 << np.arange(batch.shape[1] - 1, -1, -1, dtype=np.int64)
+            rows = batch.astype(np.int64) @ weights
+        else:
+            rows = batch.astype(np.int64)
+            valid = (rows >= 0) & (rows < 2**width)
+        results = np.full(len(rows), -1, dtype=np.int8)
+        outputs = self._outputs
+        if isinstance(outputs, BitVector):
+            packed = np.frombuffer(outputs.data, dtype=np.uint8)
+            selected = rows[valid]
+            results[valid] = (packed[selected >> 3] >> (selected & 7)) & 1
+        elif isinstance(outputs, np.ndarray):
+            results[valid] = outputs[rows[valid]]
+        else:
+            results[valid] = [outputs[row] for row in rows[valid].tolist()]
+        return results, valid
+
+    def iter_rows(self, start=0, end=None):
+        """
+        Yields the inputs and output of each row of the truth table in the given
+        range, being [start, end), as tuples of bits.
+
+        e.g. For expression=A.B, yields (0, 0, 0), (0, 1, 0), (1, 0, 0) and
+        (1, 1, 1)
+
+        Arguments:
+            start (int): index of first row
+            end (int): index after last row, defaulting to the number of rows
+
+        Raises:
+            IndexError: if range exceeds the rows of the table
+
+        Returns (generator[tuple[int]]): inputs of each variable followed by
+            output of each row
+        """
+        start, end = self._row_range(start, end)
+        width = f"0{len(self.variables)}b"
+        outputs = self._outputs
+        for i in range(start, end):
+            yield (*map(int, format(i, width)), int(outputs[i]))
+
+    @_profiled("rendering")
+    def render_to(self, fileobj, start=0, end=None, format="text"):
+        """
+        Writes a representation of the rows of the truth table in the given
+        range, being [start, end), to the given file. Rows are rendered and
+        written in chunks, such that the representation of the table is never
+        held in memory in its entirety.
+
+        Formats:
+        - text: table-like arrangement as returned by str(table)
+        - csv: comma-separated values, with a header of aliases and 'X'
+        - tsv: tab-separated values, with a header of aliases and 'X'
+
+        Arguments:
+            fileobj (file): writable text file
+            start (int): index of first row
+            end (int): index after last row, defaulting to the number of rows
+            format (str): format of representation ('text', 'csv' or 'tsv')
+
+        Raises:
+            IndexError: if range exceeds the rows of the table
+            ValueError: if format is not 'text', 'csv' or 'tsv'
+
+        Returns (int): number of characters written
+        """
+        start, end = self._row_range(start, end)
+        header, template = self._row_template(format)
+        fileobj.write(header)
+        written = len(header)
+        for i in range(start, end, _RENDER_CHUNK_ROWS):
+            rows = self._row_strings(i, min(i + _RENDER_CHUNK_ROWS, end))
+            chunk = "".join([template % row for row in rows])
+            fileobj.write(chunk)
+            written += len(chunk)
+        if profiler.enabled:
+            profiler.count("bytes_rendered", written)
+        return written
+
+    def save(self, path):
+        """
+        Writes this truth table to the given file, from which it may be loaded
+        by TruthTable.load without evaluating its expression again.
+
+        The file consists of a fixed-size header (the magic number b'TTBL', the
+        version of the format and the length of the metadata), the metadata
+        (a UTF-8 JSON object of the expression, ordering of variables, aliases,
+        operator symbols and number of rows), padding to a multiple of 8 bytes,
+        and the outputs packed eight to a byte, of which bit (i % 8) of byte
+        (i // 8) is the output of row i.
+
+        Arguments:
+            path (str): path of file to be written
+        """
+        with open(path, "wb") as file:
+            self._write(file)
+
+    def _write(self, file):
+        """
+        Writes this truth table to the given binary file in the format of save.
+
+        Arguments:
+            file (file): writable binary file
+        """
+        outputs = self._materialise()
+        if isinstance(outputs, BitVector):
+            packed = outputs.data
+        else:
+            packed = _numpy.packbits(outputs, bitorder="little").tobytes()
+        metadata = json.dumps(
+            {
+                "expression": self.expression,
+                "variables": list(self.variables),
+                "aliases": dict(self.aliases),
+                "operators": self._operator_names(),
+                "rows": 2 ** len(self.variables),
+            }
+        ).encode("utf-8")
+        header = _FILE_HEADER.pack(_FILE_MAGIC, _FILE_VERSION, len(metadata))
+        padding = -(len(header) + len(metadata)) % 8
+        file.write(header)
+        file.write(metadata)
+        file.write(b"\0" * padding)
+        file.write(packed)
+
+    @classmethod
+    def load(cls, path, mmap=True, backend=None):
+        """
+        Returns the truth table saved to the given file by save. The expression
+        is validated and compiled, but not evaluated. If mmap is true, the file
+        is memory-mapped and the outputs of a table with the python backend are
+        read directly from the mapping, without being copied into memory.
+
+        Arguments:
+            path (str): path of file written by save
+            mmap (boolean): if true, memory-map the file rather than reading it
+            backend (str): backend of table, defaulting to the backend set by
+                set_default_backend
+
+        Raises:
+            ValueError: if file is not a saved truth table of a supported
+                version
+
+        Returns (TruthTable): table saved to file
+        """
+        with open(path, "rb") as file:
+            if mmap:
+                import mmap as mapping
+
+                buffer = memoryview(
+                    mapping.mmap(file.fileno(), 0, access=mapping.ACCESS_READ)
+                )
+            else:
+                buffer = memoryview(file.read())
+        if len(buffer) < _FILE_HEADER.size:
+            raise ValueError("File is not a saved truth table")
+        magic, version, length = _FILE_HEADER.unpack_from(buffer)
+        if magic != _FILE_MAGIC:
+            raise ValueError("File is not a saved truth table")
+        if version != _FILE_VERSION:
+            raise ValueError(f"Unsupported truth table file version: {version}")
+        start = _FILE_HEADER.size + length
+        try:
+            metadata = json.loads(bytes(buffer[_FILE_HEADER.size : start]))
+        except ValueError:
+            raise ValueError("File is not a saved truth table") from None
+        if not isinstance(metadata, dict) or any(
+            not isinstance(metadata.get(key), kind)
+            for key, kind in _FILE_FIELDS.items()
+        ):
+            raise ValueError("File is not a saved truth table")
+        if any(x not in _OPERATIONS for x in metadata["operators"].values()):
+            raise ValueError("File is not a saved truth table")
+        start += -start % 8
+        rows = metadata["rows"]
+        packed = buffer[start : start + (rows + 7) // 8]
+        if len(packed) != (rows + 7) // 8:
+            raise ValueError("File is not a saved truth table")
+
+        table = TruthTable._blank(backend)
+        table.operations = TruthTable._operation_table(metadata["operators"])
+        table.expression = metadata["expression"]
+        table._validate_expression()
+        table.variables = table._parse_variables()
+        table._check_ordering(metadata["variables"])
+        if rows != 2 ** len(table.variables):
+            raise ValueError("File is not a saved truth table")
+        table.variables = list(metadata["variables"])
+        table._program = table._compile_expression()
+        table.aliases = metadata["aliases"]
+        if table.backend == "numpy":
+            outputs = _numpy.unpackbits(
+                _numpy.frombuffer(packed, dtype=_numpy.uint8),
+                count=rows,
+                bitorder="little",
+            )
+            outputs.flags.writeable = False
+            table._set_outputs(outputs)
+        else:
+            table._set_outputs(BitVector(packed, rows))
+        return table
 
     def set_expression(self, expression):
         """
@@ -94,11 +541,23 @@ class TruthTable:
             expression (str): expression to which this table's expression will
                 be set
         """
+        separated = _SEPARATED_VARIABLES.search(expression)
+        if separated:
+            i = separated.end() - 1
+            raise InvalidExpressionError(
+                f"Variable must precede or follow an operator ({i})", i
+            )
         self.expression = expression.replace(" ", "")
-        self._validate_expression()
+        key = self._cache_key()
+        entry = expression_cache.get(key)
+        if entry is not None:
+            self._restore(entry)
+            return
+        self._validate_expression(expression)
         self.variables = self._parse_variables()
         self._parse_expression()
         self.clear_aliases()
+        expression_cache.put(key, self._cache_entry())
 
     def set_alias(self, variable, alias):
         """
@@ -123,15 +582,147 @@ class TruthTable:
         Returns true if the expression of this truth table is equivalent to
         given expression (i.e. they both yield the same outputs).
 
+        For lazy tables, the given expression is only compiled, and the
+        expressions are equivalent if the exclusive or of the two (with the
+        variables of each in the order of their table) is unsatisfiable, which
+        is determined without evaluating every row.
+
         Returns (boolean): true if given expression is equivalent to the
             expression of this table
         """
-        if expression != self.expression:
-            table = TruthTable(expression)
-        else:
-            table = self
-        return table == self
+        if expression == self.expression:
+            return True
+        if not self.lazy or self.backend == "bdd":
+            return TruthTable(expression, self.backend) == self
+        table = TruthTable(expression, self.backend, lazy=True)
+        width = len(self.variables)
+        if len(table.variables) != width:
+            return False
+        # Program of the exclusive or of both expressions, of which variables
+        # are referred to by position
+        offset = len(self._program)
+        program = list(self._program)
+        for op, a, b in table._program:
+            if op == "VAR":
+                program.append((op, a, b))
+            else:
+                program.append((op, a + offset, None if b is None else b + offset))
+        program.append(("XOR", offset - 1, len(program) - 1))
+        return not _search_rows(program, width, 1, 1, False)
+
+    def is_satisfiable(self):
+        """
+        Returns true if the output of any row of this truth table is 1. For lazy
+        tables and views, this is determined by a search over partial
+        assignments of the variables which stops at the first satisfying row,
+        rather than by evaluating every row.
+
+        Returns (boolean): true if expression is satisfiable
+        """
+        if self.backend == "bdd":
+            return self.bdd() != 0
+        return bool(self._find_rows(1, 1, False))
+
+    def is_tautology(self):
+        """
+        Returns true if the output of every row of this truth table is 1. For
+        lazy tables and views, this is determined by a search over partial
+        assignments of the variables which stops at the first unsatisfying row,
+        rather than by evaluating every row.
+
+        Returns (boolean): true if expression is a tautology
+        """
+        if self.backend == "bdd":
+            return self.bdd() == 1
+        return not self._find_rows(0, 1, False)
+
+    def find_satisfying(self, k=1):
+        """
+        Returns the inputs of the first k rows of this truth table of which the
+        output is 1, in order of rows. For lazy tables, views and tables using
+        the bdd backend, these are found by a search over partial assignments
+        of the variables, without evaluating every row.
+
+        e.g. For expression=A+B, k=2, returns ['01', '10']
 
+        Arguments:
+            k (int): maximum number of rows
+
+        Returns (list[str]): inputs of satisfying rows, as accepted by
+            get_output
+        """
+        return [self._get_inputs(row) for row in self._find_rows(1, k)]
+
+    def count_satisfying(self):
+        """
+        Returns the number of rows of this truth table of which the output is 1.
+        For tables with the bdd backend and lazy tables, this is counted from
+        the binary decision diagram of the expression without evaluating the
+        outputs of any rows (unlike is_satisfiable, a count cannot stop early,
+        and a BDD counts the rows of parities and similar functions far faster
+        than a search over partial assignments).
+
+        Returns (int): number of satisfying combinations of inputs
+        """
+        if self.backend == "bdd" or self.lazy:
+            return _shared_bdd.count(self.bdd(), len(self.variables))
+        outputs = self._materialise()
+        if self.backend == "numpy":
+            return int(outputs.sum())
+        return outputs.count(1)
+
+    @_profiled("bdd")
+    def bdd(self):
+        """
+        Returns the reduced ordered binary decision diagram (BDD) of the
+        expression of this table, being a node in a BDD shared by all tables.
+        The level of each variable is its index in self.variables, such that
+        the outputs of two tables with the same number of variables are equal
+        if and only if their BDDs are the same node. The BDD is constructed
+        upon first use, unless the table uses the bdd backend.
+
+        Returns (int): root node of BDD of expression
+        """
+        if self._bdd_node is None:
+            self._bdd_node = _shared_bdd.build(self._program)
+        return self._bdd_node
+
+    def compile(self, mode="variables", lanes=None):
+        """
+        Returns a Python function computing the expression of this table,
+        generated as straight-line code of the operators &, | and ^ from the
+        compiled program of the expression.
+
+        Modes:
+        - variables: f(A, B, ...) returns the output (0 or 1) for the inputs of
+          the variables, given in the order of self.variables. Parameters are
+          named after the variables, unless any variable is a Python keyword.
+        - row: f(row) returns the output of the given row index (e.g. for
+          variables A, B and C, row 3 sets A=0, B=1 and C=1)
+        - mask: f(A, B, ...) applies the expression to integer bitmasks, each
+          bit of which is an independent input of the variable, and returns the
+          bitmask of outputs. Negation is ~x unless a number of lanes is given,
+          in which case the outputs are confined to that many bits.
+
+        e.g. For expression='A.!B', TruthTable(expression).compile()(1, 0) == 1
+        and TruthTable(expression).compile('mask', 4)(0b1100, 0b1010) == 0b0100
+
+        Arguments:
+            mode (str): mode of function ('variables', 'row' or 'mask')
+            lanes (int): number of bits of bitmasks in mask mode, or None
+
+        Raises:
+            ValueError: if mode is not 'variables', 'row' or 'mask'
+
+        Returns (function): function computing expression
+        """
+        if mode not in ("variables", "row", "mask"):
+            raise ValueError("Mode must be variables, row, or mask")
+        return _generate_function(
+            self._program, self.variables, mode, lanes, self.expression
+        )
+
+    @_profiled("sum_of_products")
     def sum_of_products(self):
         """
         Returns sum of products expression for this truth table.
@@ -151,19 +742,123 @@ class TruthTable:
 
         Returns (str): sum of products for this truth table
         """
-        products = ""
+        outputs = self._materialise()
+        products = []
         # indices of true outputs
-        trues = [i for i in range(0, len(self.outputs)) if self.outputs[i] == 1]
+        trues = [i for i, x in enumerate(outputs) if x == 1]
 
-        for i, x in enumerate(trues):
+        for x in trues:
             inputs = self._get_inputs(x)
-            sub = ""
-            for j in range(0, len(inputs)):
-                sub += (
-                    f"{'!'*(inputs[j]=='0')}{self.variables[j]}{'.'*(j<len(inputs)-1)}"
-                )
-            products += f"({sub}){'+'*(i<(len(trues)-1))}"
-        return products
+            sub = ".".join(
+                f"{'!'*(inputs[j]=='0')}{self.variables[j]}"
+                for j in range(0, len(inputs))
+            )
+            products.append(f"({sub})")
+        return "+".join(products)
+
+    @_profiled("minimisation")
+    def minimal_sum_of_products(self, method="auto"):
+        """
+        Returns a minimal (or near-minimal) sum of products expression for this
+        truth table. Unlike sum_of_products, the returned expression indicates
+        the order of operations by parentheses, and so is itself a valid
+        expression for a TruthTable.
+
+        e.g. The following table will return 'A+B'
+        +---+---++---+
+        | A | B || X |
+        +---+---++---+
+        | 0 | 0 || 0 |
+        +---+---++---+
+        | 0 | 1 || 1 |
+        +---+---++---+
+        | 1 | 0 || 1 |
+        +---+---++---+
+        | 1 | 1 || 1 |
+        +---+---++---+
+
+        Methods:
+        - qm: Quine-McCluskey, finding all prime implicants and choosing the
+          essential prime implicants followed by those covering the most
+          remaining outputs
+        - espresso: Espresso-like heuristic, expanding implicants from each
+          uncovered output as far as possible, for tables too large for qm
+        - auto: qm for tables of at most 10 variables, otherwise espresso
+
+        Arguments:
+            method (str): minimisation method ('auto', 'qm', or 'espresso')
+
+        Raises:
+            ValueError: if method is not 'auto', 'qm', or 'espresso'
+
+        Returns (str): minimal sum of products for this truth table
+        """
+        width = len(self.variables)
+        ones = self._outputs_mask()
+        if ones == 0:
+            return f"{self.variables[0]}.!{self.variables[0]}"
+        implicants = _minimise(ones, width, method)
+        products = [
+            _join_operands(self._literals(value, care, False), ".")
+            for value, care in implicants
+        ]
+        if not all(products):
+            return f"{self.variables[0]}+!{self.variables[0]}"
+        return _join_operands(products, "+")
+
+    @_profiled("minimisation")
+    def minimal_product_of_sums(self, method="auto"):
+        """
+        Returns a minimal (or near-minimal) product of sums expression for this
+        truth table, found by minimising the sum of products of the inverse of
+        the table. The returned expression is a valid expression for a
+        TruthTable.
+
+        e.g. For expression=(A+B).(A+C), returns '(A+B).(A+C)'
+
+        Arguments:
+            method (str): minimisation method ('auto', 'qm', or 'espresso'), as
+                for minimal_sum_of_products
+
+        Raises:
+            ValueError: if method is not 'auto', 'qm', or 'espresso'
+
+        Returns (str): minimal product of sums for this truth table
+        """
+        width = len(self.variables)
+        zeros = self._outputs_mask() ^ ((1 << 2**width) - 1)
+        if zeros == 0:
+            return f"{self.variables[0]}+!{self.variables[0]}"
+        implicants = _minimise(zeros, width, method)
+        sums = [
+            _join_operands(self._literals(value, care, True), "+")
+            for value, care in implicants
+        ]
+        if not all(sums):
+            return f"{self.variables[0]}.!{self.variables[0]}"
+        return _join_operands(sums, ".")
+
+    def _literals(self, value, care, inverted):
+        """
+        Returns the literals of the given implicant, in order of variables.
+
+        Arguments:
+            value (int): values of variables of implicant, with the bits of
+                variables being those of the rows of this table
+            care (int): mask of variables included in implicant
+            inverted (boolean): if true, literals are negated (i.e. variables
+                of value 1 are negated)
+
+        Returns (list[str]): literals of implicant
+        """
+        last = len(self.variables) - 1
+        literals = []
+        for j, x in enumerate(self.variables):
+            bit = 1 << (last - j)
+            if care & bit:
+                negated = not value & bit if not inverted else bool(value & bit)
+                literals.append(f"{'!'*negated}{x}")
+        return literals
 
     def merge(self, table, operator, distinct=True):
         """
@@ -176,6 +871,10 @@ class TruthTable:
 
         e.g. 'A.B' and 'A+B', linked by '+', become '(A.B)+(C+D)'
 
+        The outputs are computed from the outputs of both tables, without
+        evaluating the merged expression (unless this table is lazy or uses the
+        bdd backend).
+
         Arguments:
             table (TruthTable): table to be merged with this table
             operator (str): operator to link expressions of given table and
@@ -185,7 +884,7 @@ class TruthTable:
                 occuring in self.expression, otherwise table.expression will
                 remain unchanged
         """
-        self.set_expression(self._merging(table, operator, distinct))
+        self._merging(table, operator, distinct, self)
 
     def merged(self, table, operator, distinct=True):
         """
@@ -208,11 +907,14 @@ class TruthTable:
         Returns (TruthTable): truth table of expression created by combining
             self.expression and table.expression linked by operator
         """
-        return TruthTable(self._merging(table, operator, distinct))
+        return self._merging(table, operator, distinct, self._spawn())
 
-    def _merging(self, table, operator, distinct=True):
+    def _merging(self, table, operator, distinct, result):
         """
-        Returns merged expression for both self.merge and self.merged.
+        Sets the expression of the given result table to the merged expression
+        for both self.merge and self.merged. The outputs of the result are
+        computed by applying the operator to the outputs of this table and the
+        given table, each arranged as outputs of the variables of the result.
 
         Arguments:
             table (TruthTable): table to be merged with this table
@@ -222,296 +924,619 @@ class TruthTable:
                 also in self.expression will be replaced with variables not
                 occuring in self.expression, otherwise table.expression will
                 remain unchanged
+            result (TruthTable): table of which expression is set, being this
+                table or a table without an expression
 
         Raises:
             TypeError: if given table is None
             InvalidExpressionError: if given operator is not legal (i.e.
                 operator in self.operations.keys() == False)
 
-        Returns (str): expression created by combining self.expression and
-            table.expression linked by operator
+        Returns (TruthTable): result table, of expression created by combining
+            self.expression and table.expression linked by operator
         """
-        if type(table) != TruthTable:
+        if not isinstance(table, TruthTable):
             raise TypeError(f"Table must be a TruthTable, not a {type(table)}")
         if operator not in self.operations.keys():
             raise InvalidExpressionError(f"Illegal operator: {operator}")
 
         texpr = table.expression
+        # Variables of given table, as they appear in merged expression
+        tvars = table.variables
 
         if distinct:
-            texpr = self._replace_duplicates(texpr)
+            texpr, replacements = self._replace_duplicates(texpr)
+            tvars = [replacements.get(x, x) for x in tvars]
+
+        expression = f"({self.expression}){operator}({texpr})"
+        if result.lazy or result.backend == "bdd":
+            result.set_expression(expression)
+            return result
 
-        return f"({self.expression}){operator}({texpr})"
+        outputs = (self._outputs_mask(), table._outputs_mask())
+        variables = (self.variables, tvars)
+        result.expression = expression
+        result._validate_expression()
+        result.variables = result._parse_variables()
+        result._parse_expression(
+            self.operations[operator](
+                _lift_outputs(outputs[0], variables[0], result.variables),
+                _lift_outputs(outputs[1], variables[1], result.variables),
+            )
+        )
+        expression_cache.put(result._cache_key(), result._cache_entry())
+        return result
+
+    def _spawn(self):
+        """
+        Returns a new table with the backend, laziness and operators of this
+        table, of which the expression is yet to be set.
+
+        Returns (TruthTable): table without an expression
+        """
+        table = TruthTable._blank(
+            self.backend, self.lazy, self._cache_size, self._workers
+        )
+        table.operations = self.operations
+        return table
+
+    @staticmethod
+    def _blank(backend=None, lazy=False, cache_size=1024, workers=None):
+        """
+        Returns a new table with the given settings and the default operators,
+        of which the expression is yet to be set.
+
+        Returns (TruthTable): table without an expression
+        """
+        table = TruthTable.__new__(TruthTable)
+        table.expression = ""
+        table.variables = []
+        table.backend = _resolve_backend(backend)
+        table.lazy = lazy
+        table._cache_size = cache_size
+        table._workers = workers
+        table._bdd_node = None
+        table._outputs = BitVector(b"", 0)
+        table._program = []
+        table.aliases = {}
+        table._initialise_operations()
+        return table
 
     def set_ordering(self, ordering):
         """
-        Set order in which variables will be arranged in truth table.
+        Set order in which variables will be arranged in truth table. The
+        outputs are rearranged rather than recalculated, as reordering the
+        variables only permutes the rows of the table.
 
         Arguments:
             ordering (list[str]): all variables in expression as they will be
                 ordered in truth table
         """
+        self._check_ordering(ordering)
+        self._reorder(list(ordering))
+
+    def clear_ordering(self):
+        """
+        Remove specified ordering of variables and restore natural ordering
+        (i.e. order in which they appear in expression).
+        """
+        self._reorder(self._parse_variables())
+
+    def ordered(self, ordering):
+        """
+        Returns a view of this truth table with the variables arranged in the
+        given order. The outputs of the view are those of this table, of which
+        the rows are rearranged upon access rather than copied. The view is
+        unaffected by any later changes to this table.
+
+        Arguments:
+            ordering (list[str]): all variables in expression as they will be
+                ordered in view
+
+        Returns (TruthTable): table with variables arranged in given order
+        """
+        self._check_ordering(ordering)
+        view = self._spawn()
+        view.expression = self.expression
+        view.variables = list(ordering)
+        view.aliases = dict(self.aliases)
+        view._program = view._compile_expression()
+        view._outputs = OrderedOutputs(
+            self._outputs, self.variables, view.variables, self.backend
+        )
+        return view
+
+    def _check_ordering(self, ordering):
+        """
+        Determine if the given ordering contains every variable in the
+        expression exactly once.
+
+        Raises:
+            TypeError: if ordering is None
+            InvalidExpressionError: if ordering does not contain all variables
+                in expression
+        """
         if ordering is None:
             raise TypeError("Ordering cannot be None")
-        if set(ordering) != set(self.variables):
+        if set(ordering) != set(self.variables) or len(ordering) != len(self.variables):
             raise InvalidExpressionError(
                 "Ordering must contain all variables in expression"
             )
+
+    def _reorder(self, ordering):
+        """
+        Arranges the variables of this table in the given order, permuting the
+        rows of the existing outputs. The outputs of lazy tables, and tables
+        using the bdd backend, are recalculated.
+
+        Arguments:
+            ordering (list[str]): all variables in expression
+        """
+        if self.lazy or self.backend == "bdd":
+            self.variables = ordering
+            self._parse_expression()
+            return
+        key = self._cache_key(ordering)
+        entry = expression_cache.get(key)
+        if entry is not None:
+            self._restore(entry)
+            return
+        width = len(ordering)
+        destination = [width - 1 - ordering.index(x) for x in reversed(self.variables)]
+        outputs = _permute_rows(self._outputs_mask(), width, destination)
         self.variables = ordering
-        self._parse_expression()
+        self._parse_expression(outputs)
+        expression_cache.put(key, self._cache_entry())
 
-    def clear_ordering(self):
+    def _cache_key(self, ordering=None):
         """
-        Remove specified ordering of variables and restore natural ordering
-        (i.e. order in which they appear in expression).
+        Returns the key of this table in the expression cache, being its
+        expression, ordering of variables, operators and backend.
+
+        Arguments:
+            ordering (list[str]): ordering of variables, or None for the natural
+                ordering
+
+        Returns (tuple): key of table in cache
         """
-        self.variables = self._parse_variables()
-        self._parse_expression()
+        operators = tuple(sorted(self._operator_names().items()))
+        ordering = None if ordering is None else tuple(ordering)
+        return (self.expression, ordering, operators, self.backend)
+
+    def _cache_entry(self):
+        """
+        Returns the entry of this table in the expression cache, being its
+        variables, compiled program and outputs (if evaluated).
+
+        Returns (tuple): entry of table in cache
+        """
+        outputs = self._outputs
+        if isinstance(outputs, (LazyOutputs, OrderedOutputs)):
+            outputs = None
+        return (tuple(self.variables), self._program, outputs)
+
+    def _restore(self, entry):
+        """
+        Sets the variables, compiled program and outputs of this table from an
+        entry of the expression cache. The outputs are evaluated if the entry
+        does not contain them (and this table is not lazy). The outputs of lazy
+        tables remain LazyOutputs, already materialised if the entry contains
+        them.
+
+        Arguments:
+            entry (tuple): entry of table with same expression in cache
+        """
+        variables, program, outputs = entry
+        self.variables = list(variables)
+        self.clear_aliases()
+        self._program = program
+        self._set_outputs(outputs)
+        if outputs is None and not self.lazy and self.backend != "bdd":
+            expression_cache.put(self._cache_key(), self._cache_entry())
 
     def add_operator(self, name, symbol):
         """
         Assign the given symbol to the function of the given name (AND, XOR, or
-        OR). Symbol must be a single non-letter character.
+        OR). Symbol must be a single character which may not occur in a
+        variable (i.e. not a letter, digit or underscore).
 
         Arguments:
             name (str): name of operator to be added (AND, XOR, or OR)
             symbol (str): symbol of operator to be added
         """
-        operators = {"AND": [".", "&"], "OR": ["+", "|"], "XOR": ["^", "#"]}
         if name not in ["AND", "OR", "XOR"]:
             raise InvalidExpressionError("Name must be AND, OR, or XOR")
-        if len(symbol) != 1 or symbol in string.ascii_letters:
-            raise InvalidExpressionError("Symbol must be a single non-letter character")
-        for op in operators:
-            if symbol in operators[op]:
-                raise InvalidExpressionError(f"'{symbol}' is already an operator")
+        if len(symbol) != 1 or symbol in _IDENTIFIER_CHARACTERS:
+            raise InvalidExpressionError(
+                "Symbol must be a single character other than a letter, digit or "
+                "underscore"
+            )
+        if symbol in _DEFAULT_OPERATORS:
+            raise InvalidExpressionError(f"'{symbol}' is already an operator")
 
-        self.operations[symbol] = self.functions[name]
+        names = self._operator_names()
+        names[symbol] = name
+        self.operations = TruthTable._operation_table(names)
 
     def _replace_duplicates(self, expression):
-        # Variables in self.expression also in table.expression
-        duplicates = []
+        """
+        Replaces any variables in the given expression also in self.expression
+        with variables occuring in neither expression.
+
+        Arguments:
+            expression (str): expression of which variables are replaced
 
-        for x in expression:
-            if x in string.ascii_letters and x in self.expression:
-                duplicates.append(x)
+        Returns (tuple[str, dict[str, str]]): expression with variables
+            replaced, and the replacement of each replaced variable
+        """
+        tokens = _tokenize(expression)
+        variables = set(self.variables)
+        # Variables of expression, of which those also in self.expression are
+        # replaced
+        others = [x for x in dict.fromkeys(tokens) if x[0] in _IDENTIFIER_START]
+        duplicates = [x for x in others if x in variables]
 
         # Available variables that may replace duplicate variables in
-        # table.expression
-        available = iter(
-            sorted(
-                set(string.ascii_uppercase).difference(
-                    set(self.expression).intersection(string.ascii_letters)
-                )
-            )
-        )
+        # expression
+        used = variables.union(others)
+        available = (x for x in _variable_names() if x not in used)
 
-        for x in duplicates:
-            expression = expression.replace(x, next(available))
-        return expression
+        replacements = {x: next(available) for x in duplicates}
+        expression = "".join([replacements.get(x, x) for x in tokens])
+        return expression, replacements
 
-    def _parse_expression(self):
+    def _parse_expression(self, outputs=None):
         """
         Calculates outputs of truth table for boolean expression of this truth
-        table.
+        table. The expression is compiled once and the resulting program is
+        evaluated for all rows at once, or for individual rows on demand if this
+        table is lazy.
+
+        Arguments:
+            outputs (int): mask of outputs of expression, of which bit i is the
+                output of row i, if already known (in which case the program is
+                not evaluated)
         """
-        self.outputs = []
         self.clear_aliases()
+        self._program = self._compile_expression()
+        self._set_outputs(outputs)
 
-        expression = f"({self.expression})"
+    def _set_outputs(self, outputs=None):
+        """
+        Sets the outputs of this table from its compiled program. Outputs are
+        evaluated for all rows at once, or for individual rows on demand if this
+        table is lazy.
 
-        for i in range(0, 2 ** len(self.variables)):
-            inputs = self._get_inputs(i)
-            self.outputs.append(self._evaluate_expression(expression, inputs))
+        Arguments:
+            outputs (int, BitVector or numpy.ndarray): mask of outputs of
+                expression, of which bit i is the output of row i, or complete
+                set of outputs, if already known (in which case the program is
+                not evaluated)
+        """
+        self._bdd_node = None
+        if self.backend == "bdd":
+            self._outputs = LazyOutputs(
+                self._program,
+                self.functions,
+                len(self.variables),
+                self.backend,
+                self._cache_size,
+                self.bdd(),
+            )
+        elif isinstance(outputs, int):
+            self._outputs = _outputs_from_mask(
+                outputs, len(self.variables), self.backend
+            )
+        elif self.lazy:
+            # Outputs already known (e.g. from the expression cache) are kept
+            # as materialised, such that lazy tables always have LazyOutputs
+            self._outputs = LazyOutputs(
+                self._program,
+                self.functions,
+                len(self.variables),
+                self.backend,
+                self._cache_size,
+                outputs=outputs,
+            )
+        elif outputs is not None:
+            self._outputs = outputs
+        elif (
+            self._workers
+            and self.backend != "gray"
+            and len(self.variables) >= _PARALLEL_MIN_VARIABLES
+        ):
+            self._outputs = _evaluate_parallel(
+                self._program, len(self.variables), self.backend, self._workers
+            )
+        else:
+            self._outputs = _evaluate_outputs(
+                self._program, self.functions, len(self.variables), self.backend
+            )
 
+    @_profiled("variables")
     def _parse_variables(self):
-        non_variables = list(self.operations.keys()) + ["(", ")", "!"]
-        # Variables in expression
-        expr_variables = set(self.expression).difference(non_variables)
-        # Variables in order of appearance in expression
-        variables = []
-        # Necessary to maintain order of variables
-        for x in self.expression:
-            if x in expr_variables and x not in variables:
-                variables.append(x)
-        return variables
-
-    def _evaluate_expression(self, expression, inputs):
         """
-        Evaluate given boolean expression for some combination of inputs.
-
-        Arguments:
-            expression (str): boolean expression to be evaluated
-            variables (list[str]): list of variables in complete expression
-            inputs (str): binary string, with each bit being the input for the
-                variable at the same index in 'variables'
+        Returns (list[str]): variables of expression, in order of appearance
+        """
+        tokens = dict.fromkeys(_tokenize(self.expression))
+        return [x for x in tokens if x[0] in _IDENTIFIER_START]
 
-        Returns: (str) Output of expression
+    @_profiled("compilation")
+    def _compile_expression(self):
         """
-        expression = list(expression)
+        Compiles the (valid) expression of this table into a flat program. Each
+        instruction of the program is a tuple (op, a, b), where op is one of
+        'VAR', 'NOT', 'AND', 'OR' or 'XOR':
+        - ('VAR', i, None) yields the input of self.variables[i]
+        - ('NOT', j, None) yields the negation of the result of instruction j
+        - (name, j, k) yields self.functions[name] applied to the results of
+          instructions j and k
 
-        while len(expression) > 1:
-            # Index of initial/opening bracketof sub-expression
-            start = 0
-            for i in range(0, len(expression)):
-                if expression[i] == "(":
-                    start = i
-                if expression[i] == ")":
-                    result = self._compute_output(expression[start : i + 1], inputs)
-                    expression[start : i + 1] = result
-                    break
-        return int(expression[0])
+        Instructions only refer to earlier instructions, and the result of the
+        final instruction is the output of the expression.
 
-    def _compute_output(self, sub, inputs):
-        """
-        Compute result of two-variable boolean expression, being a component of
-        some larger expression (e.g. C.D in A+(B.(C.D)))
+        Instructions are hash-consed, such that the program is a directed
+        acyclic graph of which each distinct subexpression is a single
+        instruction, evaluated once however often it occurs. The operands of
+        AND, OR and XOR are ordered, such that (e.g.) 'A.B' and 'B.A' are the
+        same instruction.
 
-        Arguments: sub (list[str]): sub-expression to be evaluated
+        e.g. '!A.(B+C)' compiles to
+        [('VAR', 0, None), ('NOT', 0, None), ('VAR', 1, None),
+         ('VAR', 2, None), ('OR', 2, 3), ('AND', 1, 4)]
+        and '(A.B)+(B.A)' compiles to
+        [('VAR', 0, None), ('VAR', 1, None), ('AND', 0, 1), ('OR', 2, 2)]
 
-        Returns: (str) Output of sub-expression if inputs are valid, otherwise
-            returns -1
+        Returns (list[tuple]): compiled program of expression
         """
-        # Bits to be evaluated
-        results = []
-        # Operation to be performed
-        op = ""
-        # Replace variables with appropriate bits
-        for i in range(0, len(sub)):
-            element = sub[i]
-            if element not in (self.variables + ["0", "1"]):
-                op = element if element in self.operations.keys() else op
+        program = []
+        # Index of each distinct instruction in program
+        interned = {}
+        positions = {x: i for i, x in enumerate(self.variables)}
+        names = self._operator_names()
+
+        # Operands, operator and negation of each open subexpression, with the
+        # outermost subexpression being the expression itself
+        groups = [([], None, False)]
+        negate = False
+        for token in _tokenize(self.expression):
+            if token == "(":
+                groups.append(([], None, negate))
+                negate = False
                 continue
-            result = -1
-            if sub[i - 1] == "!":
-                r = (
-                    inputs[self.variables.index(element)]
-                    if element in self.variables
-                    else sub[i]
-                )
-                result = int(r) ^ 1
-            elif element in self.variables:
-                result = inputs[self.variables.index(element)]
+            if token == "!":
+                negate = True
+                continue
+            if token in names:
+                operands, _, negated = groups[-1]
+                groups[-1] = (operands, names[token], negated)
+                continue
+            if token == ")":
+                operands, name, negate = groups.pop()
+                index = self._compile_group(program, interned, operands, name)
             else:
-                result = element
-            results.append(int(result))
-        # If expression contained only single variable (e.g. 'A')
-        if op == "":
-            return str(results[0])
-        else:
-            return str(self.operations[op](results[0], results[1]))
+                index = _intern(program, interned, "VAR", positions[token])
+            if negate:
+                index = _intern(program, interned, "NOT", index)
+                negate = False
+            groups[-1][0].append(index)
+
+        operands, name, _ = groups[0]
+        self._compile_group(program, interned, operands, name)
+        return program
 
-    def _validate_expression(self):
+    def _operator_names(self):
         """
-        Determines if expression is valid. A valid expression will consist only
-        of single-character variables and valid operators (i.e. '.', '^', '+',
-        and '!'). The order of operations will be appropriately defined by
-        closed parentheses.
+        Returns (dict[str, str]): name of function (AND, OR, or XOR) of each
+            operator symbol
+        """
+        names = {}
+        for symbol, function in self.operations.items():
+            for name in self.functions:
+                if self.functions[name] is function:
+                    names[symbol] = name
+        return names
 
-        Invalid Expressions:
-        - A.
-        - A.(B+C
-        - A!.B
+    def _compile_group(self, program, interned, operands, name):
         """
-        self._check_bracket_closure()
-        self._check_symbols()
-        self._check_precedence()
+        Appends the instruction for a subexpression of one or two operands to
+        the given program, unless it is already in the program.
+
+        Arguments:
+            program (list[tuple]): program being compiled
+            interned (dict[tuple, int]): index of each instruction in program
+            operands (list[int]): indices of instructions of operands
+            name (str): name of operator linking operands, None if there is
+                only a single operand
 
-    def _check_symbols(self):
+        Returns (int): index of instruction yielding result of subexpression
         """
-        Determine if non-parathetic symbols are legal (i.e. letters or
-        operators) and are in a valid order (i.e. operators precede and follow
-        variables, and vice versa).
+        if name is None:
+            return operands[0]
+        return _intern(program, interned, name, operands[0], operands[1])
 
-        Raises: InvalidExpressionError: if expression contains illegal symbols
+    def node_counts(self):
         """
-        message = ""
-        prev = "\n"
-        expression = self.expression.replace("(", "").replace(")", "")
+        Returns the number of nodes of the expression of this table as a tree,
+        in which each occurrence of a subexpression is a separate node, and as
+        the shared graph of its compiled program, in which identical
+        subexpressions are a single node.
 
-        for i in range(0, len(expression)):
-            char = expression[i]
-            if char in self.operations.keys() and (
-                prev not in string.ascii_letters or i == (len(expression) - 1)
-            ):
-                message = (
-                    f"Operator must occur between variables or subexpressions ({i})"
-                )
-                break
-            elif (
-                char in string.ascii_letters
-                and i > 0
-                and prev != "!"
-                and prev not in self.operations.keys()
-            ):
-                message = f"Variable must precede or follow an operator ({i})"
-                break
-            elif char == "!" and (
-                (prev not in self.operations.keys() and i > 0)
-                or (i == (len(expression) - 1))
-            ):
-                message = f"Negator must precede a variable {'and follow an operator '*(i>0)}({i})"
-            elif (
-                char != "!"
-                and char not in self.operations.keys()
-                and char not in string.ascii_letters
-            ):
-                message = f"Invalid symbol in expression: {char} ({i})"
-                break
-            prev = char
-        if message or not expression:
-            message += "Expression must contain variables and operators" * (
-                len(expression) == 0
-            )
-            raise InvalidExpressionError(message)
+        e.g. For '((A.B)+C).(C+(B.A))', returns {'tree': 11, 'shared': 6}
 
-    def _check_bracket_closure(self):
+        Returns (dict[str, int]): number of nodes before and after sharing
         """
-        Determine if expression brackets are properly matched.
+        tree = sum(1 for x in _tokenize(self.expression) if x not in "()")
+        return {"tree": tree, "shared": len(self._program)}
 
-        e.g. 'A.(B+C)' is valid, 'A.(B+C' is not
+    def _find_rows(self, value, limit, ordered=True):
+        """
+        Returns the first rows of this table of which the output is the given
+        value. The evaluated outputs are scanned if available, otherwise the
+        compiled program is searched.
 
-        Raises:
-            InvalidExpressionError: if brackets are improperly matched
-        """
-        # Open brackets increment, closed brackets decrement, valid expression
-        # has closure of 0
-        closure = 0
-        change = {"(": 1, ")": -1}
-        for x in self.expression:
-            closure += change.get(x, 0)
-            if closure < 0:
-                break
-        if closure != 0:
-            raise InvalidExpressionError("Brackets are improperly matched")
+        Arguments:
+            value (int): output of rows (0 or 1)
+            limit (int): maximum number of rows
+            ordered (boolean): if true, the first rows are found, otherwise any
+                rows may be found
+
+        Returns (list[int]): indices of rows, in ascending order
+        """
+        outputs = self._outputs
+        if isinstance(outputs, (LazyOutputs, OrderedOutputs)):
+            width = len(self.variables)
+            return _search_rows(self._program, width, value, limit, ordered)
+        if not isinstance(outputs, BitVector):
+            return [int(x) for x in _numpy.flatnonzero(outputs == value)[:limit]]
+        mask = outputs.to_int()
+        if value == 0:
+            mask ^= (1 << len(outputs)) - 1
+        rows = []
+        while mask and len(rows) < limit:
+            lowest = mask & -mask
+            rows.append(lowest.bit_length() - 1)
+            mask ^= lowest
+        return rows
+
+    def _output(self, row):
+        """
+        Returns output of the given row.
+
+        Arguments:
+            row (int): index of row
+
+        Returns (int): output of row
+        """
+        return int(self._outputs[row])
+
+    def _outputs_mask(self):
+        """
+        Returns the outputs of this table as a mask of which bit i is the output
+        of row i, regardless of backend.
+
+        Returns (int): mask of outputs
+        """
+        return _outputs_to_mask(self._materialise())
+
+    def _materialise(self):
+        """
+        Evaluates all outputs of a lazy table or view, if they have not already
+        been evaluated.
+
+        Returns (BitVector or numpy.ndarray): complete set of outputs
+        """
+        if isinstance(self._outputs, (LazyOutputs, OrderedOutputs)):
+            return self._outputs.materialise()
+        return self._outputs
 
-    def _check_precedence(self):
+    @_profiled("validation")
+    def _validate_expression(self, expression=None):
         """
-        Determine if order of operations is clearly indicated by paratheses. An
-        expression must consist only of parathesised subexpressions consisting
-        of two variables (or subexpressions) and one operator. The outermost
-        subexpression need not be parenthesised.
+        Determines if expression is valid. A valid expression will consist only
+        of variables and valid operators (i.e. '.', '^', '+', and '!'), where a
+        variable is a letter or underscore followed by any letters, digits and
+        underscores (e.g. 'A', 'x12' or 'req_valid'). The order of operations
+        will be appropriately defined by closed parentheses, such that every
+        parenthesised subexpression (and the expression itself) consists of a
+        single variable or subexpression, or of two linked by one operator. Each
+        may be negated by a preceding '!'.
+
+        The expression is validated in a single pass, with the state of each
+        open subexpression kept on an explicit stack.
+
+        Invalid Expressions:
+        - A.
+        - A.(B+C
+        - A!.B
+        - A.B+C
 
-        e.g. A.(B+C) is valid, A.B+C is not
+        Arguments:
+            expression (str): expression as given, of which spaces are skipped
+                such that positions of errors are those of the given expression,
+                or None to validate self.expression
 
         Raises:
-            InvalidExpressionError: if precendence/order of operations is
-                not properly indicated
-
-        """
-        expression = list(f"({self.expression})")
-        while len(expression) > 1:
-            for i in range(0, len(expression)):
-                if expression[i] == "(":
-                    start = i
-                if expression[i] == ")":
-                    sub = expression[start + 1 : i]
-                    # Sub-expression contains 3 characters (2 variables and 1
-                    # operator) + any negators that might be present
-                    if len(sub) > (3 + sub.count("!")):
-                        raise InvalidExpressionError("Order of operations unclear")
-                    expression[start : i + 1] = "X"
-                    break
+            InvalidExpressionError: if expression is invalid, with the position
+                of the first offending character
+        """
+        if expression is None:
+            expression = self.expression
+        operators = self.operations
+        letters = _IDENTIFIER_START
+        if not expression.replace(" ", ""):
+            raise InvalidExpressionError(
+                "Expression must contain variables and operators", 0
+            )
+
+        # Position of opening bracket of each open subexpression, and whether
+        # an operator has occurred in each
+        opened = [-1]
+        linked = [False]
+        operand = True  # Whether an operand (or negator) is expected next
+        negated = False
+        i = 0
+        for token in _tokenize(expression):
+            char = token[0]
+            if char == " ":
+                i += 1
+                continue
+            if operand:
+                if char in letters:
+                    operand = negated = False
+                elif char == "(":
+                    opened.append(i)
+                    linked.append(False)
+                    negated = False
+                elif char == "!" and not negated:
+                    negated = True
+                elif char == "!":
+                    raise InvalidExpressionError(
+                        f"Negator must precede a variable or subexpression ({i})", i
+                    )
+                elif char in operators or char == ")":
+                    raise InvalidExpressionError(
+                        f"Operator must occur between variables or subexpressions ({i})",
+                        i,
+                    )
+                else:
+                    raise InvalidExpressionError(
+                        f"Invalid symbol in expression: {char} ({i})", i
+                    )
+            elif char in operators:
+                if linked[-1]:
+                    raise InvalidExpressionError(
+                        f"Order of operations unclear ({i})", i
+                    )
+                linked[-1] = True
+                operand = True
+            elif char == ")":
+                if len(opened) == 1:
+                    raise InvalidExpressionError(
+                        f"Brackets are improperly matched ({i})", i
+                    )
+                opened.pop()
+                linked.pop()
+            elif char in letters or char == "(" or char == "!":
+                raise InvalidExpressionError(
+                    f"Variable must precede or follow an operator ({i})", i
+                )
+            else:
+                raise InvalidExpressionError(
+                    f"Invalid symbol in expression: {char} ({i})", i
+                )
+            i += len(token)
+
+        end = len(expression)
+        if operand:
+            raise InvalidExpressionError(
+                f"Operator must occur between variables or subexpressions ({end})",
+                end,
+            )
+        if len(opened) > 1:
+            raise InvalidExpressionError(
+                f"Brackets are improperly matched ({opened[-1]})", opened[-1]
+            )
 
     def _get_inputs(self, value):
         """
@@ -547,7 +1572,8 @@ class TruthTable:
 
         Returns (str): informal representation of truth table
         """
-        return self._get_rows_in_range(0, len(self.outputs))
+        self._materialise()
+        return self._get_rows_in_range(0, 2 ** len(self.variables))
 
     def _get_rows_in_range(self, start, end):
         """
@@ -565,47 +1591,113 @@ class TruthTable:
 
         Returns: informal string representation of rows of truth table in given range
         """
+        buffer = io.StringIO()
+        self.render_to(buffer, start, end)
+        return buffer.getvalue()[:-1]
+
+    def _row_range(self, start, end):
+        """
+        Returns the given range of rows, being [start, end), with an end of None
+        being the number of rows in the table.
+
+        Raises:
+            IndexError: if range is not empty and exceeds the rows of the table
+
+        Returns (tuple[int, int]): start and end of range
+        """
+        rows = 2 ** len(self.variables)
+        end = rows if end is None else end
+        if start < end and (start < 0 or end > rows):
+            raise IndexError("Row index out of range")
+        return start, max(start, end)
+
+    def _row_template(self, format):
+        """
+        Returns the header of a rendering of this table in the given format, and
+        the template of each row, to be filled with the input of each variable
+        and the output of the row.
+
+        e.g. For expression=A.B, format='text', returns the header
+        '+---+---++---+\n| A | B || X |\n+---+---++---+\n' and the template
+        '| %s | %s || %s |\n+---+---++---+\n'
+
+        Arguments:
+            format (str): format of rendering ('text', 'csv' or 'tsv')
+
+        Raises:
+            ValueError: if format is not 'text', 'csv' or 'tsv'
+
+        Returns (tuple[str, str]): header and template of rows
+        """
         # Variables to be displayed (i.e. aliases)
         display_vars = [self.aliases[x] for x in self.variables]
-        # Spacing of each column based on length of each display variable
-        column_spacing = []
+        if format in ("csv", "tsv"):
+            delimiter = "," if format == "csv" else "\t"
+            header = io.StringIO()
+            csv.writer(header, delimiter=delimiter, lineterminator="\n").writerow(
+                display_vars + ["X"]
+            )
+            template = delimiter.join(["%s"] * (len(display_vars) + 1)) + "\n"
+            return header.getvalue(), template
+        if format != "text":
+            raise ValueError("Format must be text, csv, or tsv")
 
         # Horiztonal table divider (e.g. '+---+---++---+')
-        line = ""
-        for x in display_vars:
-            line += "+" + ("-" * (len(x) + 2))
+        line = "".join("+" + ("-" * (len(x) + 2)) for x in display_vars)
         line += "++---+\n"
 
-        for i in range(0, len(display_vars)):
+        template = ""
+        for x in display_vars:
             # Spacings on left and right of individual input, determined by length of alias
-            left_spacing = " " * (len(display_vars[i]) // 2 + 1)
-            right_spacing = " " * (len(left_spacing) - (len(display_vars[i]) % 2 == 0))
-            column_spacing.append((left_spacing, right_spacing))
+            left_spacing = " " * (len(x) // 2 + 1)
+            right_spacing = " " * (len(left_spacing) - (len(x) % 2 == 0))
+            template += f"|{left_spacing}%s{right_spacing}"
+        template += f"|| %s |\n{line}"
+
+        # Initial row of variables
+        header = f"{line}| {' | '.join(display_vars)} || X |\n{line}"
+        return header, template
 
-        # Table representation, beginning with initial row of variables
-        string = f"{line}| {' | '.join(display_vars)} || X |\n{line}"
+    def _row_strings(self, start, end):
+        """
+        Yields the inputs and output of each row in the given range, being
+        [start, end), as tuples of '0' and '1' strings.
+        """
+        width = f"0{len(self.variables)}b"
+        outputs = self._outputs
         for i in range(start, end):
-            # Sequence of 0s and 1s forming input
-            inputs = self._get_inputs(i)
-            for j in range(0, len(display_vars)):
-                string += f"|{column_spacing[j][0]}{inputs[j]}{column_spacing[j][1]}"
-            string += f"|| {self.outputs[i]} |\n{line}"
-        return string[:-1]
+            yield (*format(i, width), str(outputs[i]))
 
     def _initialise_operations(self):
         """
         Bind the default legal operators to the appropriate functions.
         """
-        self.functions = {
-            "AND": lambda a, b: a & b,
-            "OR": lambda a, b: a | b,
-            "XOR": lambda a, b: a ^ b,
-        }
-        operators = {"AND": [".", "&"], "OR": ["+", "|"], "XOR": ["^", "#"]}
+        self.operations = TruthTable._default_operations
+
+    @staticmethod
+    def _operation_table(names):
+        """
+        Returns the interned operator table of the given operators, creating it
+        if no table has these operators.
+
+        Arguments:
+            names (dict[str, str]): name of function (AND, OR, or XOR) of each
+                operator symbol
+
+        Raises:
+            KeyError: if a name is not AND, OR, or XOR
 
-        for op in operators:
-            for symb in operators[op]:
-                self.operations[symb] = self.functions[op]
+        Returns (Mapping[str, function]): read-only table of function of each
+            operator symbol
+        """
+        key = frozenset(names.items())
+        table = TruthTable._operation_tables.get(key)
+        if table is None:
+            table = MappingProxyType(
+                {symbol: _OPERATIONS[name] for symbol, name in names.items()}
+            )
+            table = TruthTable._operation_tables.setdefault(key, table)
+        return table
 
     def __repr__(self):
         """
@@ -615,7 +1707,11 @@ class TruthTable:
 
         Returns (str): formal representation of truth table
         """
-        return f"TruthTable: expression='{self.expression}', variables={self.variables}, aliases={self.aliases}, outputs={self.outputs}"
+        if isinstance(self._outputs, (LazyOutputs, OrderedOutputs)):
+            outputs = repr(self._outputs)
+        else:
+            outputs = _format_bits(self._outputs)
+        return f"{type(self).__name__}: expression='{self.expression}', variables={self.variables}, aliases={self.aliases}, outputs={outputs}"
 
     def __eq__(self, other):
         """
@@ -627,18 +1723,2619 @@ class TruthTable:
         Returns (boolean): true if outputs of given truth table equal outputs of
             this truth table
         """
-        return other.outputs == self.outputs
+        if not isinstance(other, TruthTable):
+            return NotImplemented
+        if len(other.variables) != len(self.variables):
+            return False
+        # Canonical BDDs are compared without evaluating outputs, though BDDs
+        # are not built for tables of other backends merely to compare them
+        if self.backend == other.backend == "bdd":
+            return other.bdd() == self.bdd()
+        return other._outputs_mask() == self._outputs_mask()
 
+    def __hash__(self):
+        """
+        Returns a hash of the number of variables and the number of satisfying
+        rows of this truth table, consistent with equality. The rows of lazy
+        tables and tables using the bdd backend are counted from their BDD, and
+        are not evaluated (see count_satisfying). As a table's outputs change
+        with its expression and ordering, a table should not be modified while
+        in a set or used as a key (see freeze).
 
-class InvalidExpressionError(Exception):
-    def __init__(self, message):
-        self.message = message
+        Returns (int): hash of truth table
+        """
+        return hash((len(self.variables), self.count_satisfying()))
 
+    def fingerprint(self):
+        """
+        Returns a digest of the number of variables and outputs of this truth
+        table, in the current ordering of its variables, such that tables which
+        are equal have the same fingerprint. The outputs of lazy tables and
+        tables using the bdd backend are evaluated.
 
-if __name__ == "__main__":
-    import sys
+        Returns (bytes): 16-byte fingerprint of truth table
+        """
+        return _fingerprint(len(self.variables), self._outputs_mask())
 
-    try:
-        print(TruthTable(sys.argv[1]))
-    except IndexError:
-        pass
+    def __getstate__(self):
+        """
+        Returns the state of this truth table for pickling. The operator table
+        is given by the names of its operators, and the outputs of lazy tables,
+        views and tables using the bdd backend are omitted, to be evaluated
+        again when unpickled.
+
+        Returns (dict): state of table
+        """
+        outputs = self._outputs
+        if isinstance(outputs, (LazyOutputs, OrderedOutputs)):
+            outputs = None
+        elif isinstance(outputs, BitVector) and not isinstance(outputs.data, bytes):
+            # Outputs read from a memory-mapped file
+            outputs = BitVector(bytes(outputs.data), len(outputs))
+        return {
+            "expression": self.expression,
+            "variables": list(self.variables),
+            "aliases": dict(self.aliases),
+            "operators": self._operator_names(),
+            "backend": self.backend,
+            "lazy": self.lazy,
+            "cache_size": self._cache_size,
+            "workers": self._workers,
+            "program": self._program,
+            "outputs": outputs,
+        }
+
+    def __setstate__(self, state):
+        """
+        Sets the attributes of this truth table from the given state returned
+        by __getstate__, evaluating its outputs if they were omitted.
+
+        Arguments:
+            state (dict): state of table
+        """
+        self.expression = state["expression"]
+        self.variables = state["variables"]
+        self.aliases = state["aliases"]
+        self.operations = TruthTable._operation_table(state["operators"])
+        self.backend = state["backend"]
+        self.lazy = state["lazy"]
+        self._cache_size = state["cache_size"]
+        self._workers = state["workers"]
+        self._program = state["program"]
+        self._set_outputs(state["outputs"])
+
+    def __deepcopy__(self, memo):
+        """
+        Returns a copy of this truth table. Its compiled program and outputs are
+        shared rather than copied, as neither is modified in place.
+
+        Returns (TruthTable): copy of table
+        """
+        table = TruthTable.__new__(TruthTable)
+        for name in TruthTable.__slots__:
+            setattr(table, name, getattr(self, name))
+        table.variables = list(self.variables)
+        table.aliases = dict(self.aliases)
+        table.operations = TruthTable._operation_table(self._operator_names())
+        return table
+
+    def freeze(self):
+        """
+        Returns an immutable copy of this truth table, sharing its outputs. The
+        copy is unaffected by any later changes to this table.
+
+        Returns (FrozenTruthTable): immutable copy of table
+        """
+        frozen = FrozenTruthTable.__new__(FrozenTruthTable)
+        frozen._assign(self)
+        return frozen
+
+    @property
+    def outputs(self):
+        """
+        Returns (BitVector or numpy.ndarray): complete set of outputs of truth
+            table, where the output at index i is the output of row i. For the
+            numpy backend, this is a read-only view of the outputs. The outputs
+            of a view are rearranged upon first access, unless the table is
+            lazy or uses the bdd backend.
+        """
+        if self.lazy or self.backend == "bdd":
+            return self._outputs
+        return self._materialise()
+
+
+class FrozenTruthTable(TruthTable):
+    """
+    Immutable truth table, which may be read by several threads at once and
+    used in sets or as a key. Methods which would modify a TruthTable instead
+    return a new FrozenTruthTable, leaving this table unchanged. Outputs are
+    never modified in place, so new tables share the outputs of this table
+    unless their outputs differ (e.g. set_alias and add_operator share them,
+    and set_ordering returns a view of them rather than a copy).
+
+    Attributes are those of TruthTable, except that variables is a tuple and
+    aliases is a read-only mapping.
+    """
+
+    # Attributes which may be set after creation, being caches of values
+    # derived from the immutable attributes
+    _CACHES = frozenset(["_bdd_node", "_hash"])
+
+    __slots__ = ("_hash",)
+
+    def __init__(
+        self, expression, backend=None, lazy=False, cache_size=1024, workers=None
+    ):
+        """
+        Creates a new FrozenTruthTable using the given expression. See
+        TruthTable.
+        """
+        self._assign(TruthTable(expression, backend, lazy, cache_size, workers))
+
+    def _assign(self, table):
+        """
+        Sets the attributes of this table to those of the given table, sharing
+        its compiled program and outputs.
+
+        Arguments:
+            table (TruthTable): table of which attributes are copied
+        """
+        for name in TruthTable.__slots__:
+            object.__setattr__(self, name, getattr(table, name))
+        object.__setattr__(self, "variables", tuple(table.variables))
+        object.__setattr__(self, "aliases", MappingProxyType(dict(table.aliases)))
+        object.__setattr__(self, "_hash", None)
+
+    def thaw(self):
+        """
+        Returns a mutable copy of this truth table, sharing its outputs.
+
+        Returns (TruthTable): mutable copy of table
+        """
+        return TruthTable.__deepcopy__(self, {})
+
+    def freeze(self):
+        """
+        Returns (FrozenTruthTable): this table, being immutable already
+        """
+        return self
+
+    @classmethod
+    def load(cls, path, mmap=True, backend=None):
+        """
+        Returns the truth table saved to the given file by save, as a
+        FrozenTruthTable. See TruthTable.load.
+        """
+        return TruthTable.load(path, mmap, backend).freeze()
+
+    def set_expression(self, expression):
+        """
+        Returns a table of the given expression, with the settings and
+        operators of this table.
+
+        Returns (FrozenTruthTable): table of given expression
+        """
+        table = self.thaw()
+        table.set_expression(expression)
+        return table.freeze()
+
+    def set_alias(self, variable, alias):
+        """
+        Returns a copy of this table, of which the given variable has the given
+        alias, sharing the outputs of this table.
+
+        Returns (FrozenTruthTable): table with alias set
+        """
+        table = self.thaw()
+        table.set_alias(variable, alias)
+        return table.freeze()
+
+    def clear_aliases(self):
+        """
+        Returns a copy of this table without aliases, sharing the outputs of
+        this table.
+
+        Returns (FrozenTruthTable): table without aliases
+        """
+        table = self.thaw()
+        table.clear_aliases()
+        return table.freeze()
+
+    def add_operator(self, name, symbol):
+        """
+        Returns a copy of this table, of which the given symbol is an operator
+        of the function of the given name, sharing the outputs of this table.
+
+        Returns (FrozenTruthTable): table with operator added
+        """
+        table = self.thaw()
+        table.add_operator(name, symbol)
+        return table.freeze()
+
+    def merge(self, table, operator, distinct=True):
+        """
+        Returns the table of the expression of the given table merged with this
+        table. See TruthTable.merged.
+
+        Returns (FrozenTruthTable): table of merged expression
+        """
+        return self.merged(table, operator, distinct)
+
+    def merged(self, table, operator, distinct=True):
+        """
+        Returns the table of the expression of the given table merged with this
+        table. See TruthTable.merged.
+
+        Returns (FrozenTruthTable): table of merged expression
+        """
+        return super().merged(table, operator, distinct).freeze()
+
+    def set_ordering(self, ordering):
+        """
+        Returns a view of this table with the variables arranged in the given
+        order. See TruthTable.ordered.
+
+        Returns (FrozenTruthTable): table with variables arranged in given order
+        """
+        return self.ordered(ordering)
+
+    def clear_ordering(self):
+        """
+        Returns a view of this table with the variables arranged in their
+        natural order (i.e. order in which they appear in expression).
+
+        Returns (FrozenTruthTable): table with variables in natural order
+        """
+        return self.ordered(self._parse_variables())
+
+    def ordered(self, ordering):
+        """
+        Returns a view of this table with the variables arranged in the given
+        order. See TruthTable.ordered.
+
+        Returns (FrozenTruthTable): table with variables arranged in given order
+        """
+        return super().ordered(ordering).freeze()
+
+    def __hash__(self):
+        """
+        Returns a hash of this truth table, computed upon first use. See
+        TruthTable.__hash__.
+
+        Returns (int): hash of truth table
+        """
+        if self._hash is None:
+            self._hash = TruthTable.__hash__(self)
+        return self._hash
+
+    def __setstate__(self, state):
+        """
+        Sets the attributes of this truth table from the given state returned
+        by __getstate__. See TruthTable.__setstate__.
+        """
+        table = TruthTable.__new__(TruthTable)
+        table.__setstate__(state)
+        self._assign(table)
+
+    def __setattr__(self, name, value):
+        if name not in FrozenTruthTable._CACHES:
+            raise AttributeError(f"FrozenTruthTable is immutable: cannot set {name}")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(f"FrozenTruthTable is immutable: cannot delete {name}")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class BitVector(Sequence):
+    """
+    Immutable sequence of bits, packed eight to a byte. Bit i is stored in bit
+    (i % 8) of byte (i // 8) of the underlying buffer, such that the buffer is
+    the little-endian representation of a mask of which bit i is element i.
+
+    e.g. BitVector.from_int(0b1000, 4) == [0, 0, 0, 1]
+
+    Attributes:
+        data (bytes): packed bits, of which any bits beyond the length are 0
+    """
+
+    __slots__ = ("data", "_length")
+
+    def __init__(self, data, length):
+        """
+        Creates a new BitVector of the given length from the given packed bits.
+
+        Arguments:
+            data (bytes-like): packed bits, being at least (length + 7) // 8
+                bytes, of which any bits beyond the length are 0
+            length (int): number of bits in vector
+        """
+        self.data = data
+        self._length = length
+
+    @classmethod
+    def from_int(cls, mask, length):
+        """
+        Returns a BitVector of the given length of which element i is bit i of
+        the given mask.
+
+        Arguments:
+            mask (int): non-negative mask of at most 'length' bits
+            length (int): number of bits in vector
+
+        Returns (BitVector): vector of bits of mask
+        """
+        return cls(mask.to_bytes((length + 7) // 8, "little"), length)
+
+    @classmethod
+    def from_bits(cls, bits):
+        """
+        Returns a BitVector of the given bits.
+
+        Arguments:
+            bits (iterable[int]): bits, each being 0 or 1
+
+        Returns (BitVector): vector of given bits
+        """
+        bits = "".join("1" if x else "0" for x in bits)
+        return cls.from_int(int(bits[::-1] or "0", base=2), len(bits))
+
+    def to_int(self):
+        """
+        Returns (int): mask of which bit i is element i of this vector
+        """
+        return int.from_bytes(self.data, "little")
+
+    def count(self, value):
+        """
+        Returns (int): number of elements of this vector equal to given value
+        """
+        if value not in (0, 1):
+            return 0
+        ones = bin(self.to_int()).count("1")
+        return ones if value == 1 else self._length - ones
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step == 1:
+                length = max(stop - start, 0)
+                mask = (self.to_int() >> start) & ((1 << length) - 1)
+                return BitVector.from_int(mask, length)
+            return BitVector.from_bits(self[i] for i in range(start, stop, step))
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("BitVector index out of range")
+        return (self.data[index >> 3] >> (index & 7)) & 1
+
+    def __iter__(self):
+        length = self._length
+        for i, byte in enumerate(self.data):
+            for j in range(min(8, length - 8 * i)):
+                yield (byte >> j) & 1
+
+    def __eq__(self, other):
+        if isinstance(other, BitVector):
+            return self._length == other._length and self.data == other.data
+        try:
+            return len(other) == self._length and all(
+                x == y for x, y in zip(self, other)
+            )
+        except TypeError:
+            return NotImplemented
+
+    def __hash__(self):
+        return hash((self._length, bytes(self.data)))
+
+    def __repr__(self):
+        return _format_bits(self)
+
+
+class LazyOutputs(Sequence):
+    """
+    Sequence of the outputs of a lazy truth table, of which the output of each
+    row is evaluated when requested. The outputs of recently requested rows are
+    memoised, and all outputs are evaluated at once only upon materialisation.
+    """
+
+    __slots__ = (
+        "_program",
+        "_functions",
+        "_width",
+        "_backend",
+        "_size",
+        "_cache",
+        "_outputs",
+        "_node",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        program,
+        functions,
+        width,
+        backend,
+        cache_size=1024,
+        node=None,
+        outputs=None,
+    ):
+        """
+        Creates new LazyOutputs for the given compiled program. If the node of
+        the BDD of the program is given, the outputs of rows are evaluated from
+        the BDD rather than the program.
+
+        Arguments:
+            program (list[tuple]): compiled program of expression
+            functions (dict[str, lambda]): functions of operators of program
+            width (int): number of variables of table
+            backend (str): backend with which outputs are evaluated upon
+                materialisation
+            cache_size (int): maximum number of outputs of rows memoised, with
+                the least recently requested being discarded first
+            node (int): root node of BDD of program in shared BDD, or None
+            outputs (BitVector or numpy.ndarray): outputs of every row, if
+                already evaluated, or None
+        """
+        self._program = program
+        self._functions = functions
+        self._width = width
+        self._backend = backend
+        self._size = cache_size
+        self._cache = OrderedDict()
+        # All outputs, once materialised
+        self._outputs = outputs
+        self._node = node
+        # Guards the memoised outputs, such that tables may be read by several
+        # threads at once
+        self._lock = threading.Lock()
+
+    def materialise(self):
+        """
+        Evaluates the outputs of every row, if they have not already been
+        evaluated.
+
+        Returns (BitVector or numpy.ndarray): outputs of every row
+        """
+        if self._outputs is None:
+            self._outputs = _evaluate_outputs(
+                self._program, self._functions, self._width, self._backend
+            )
+            with self._lock:
+                self._cache.clear()
+        return self._outputs
+
+    def __len__(self):
+        return 2**self._width
+
+    def __getitem__(self, index):
+        if self._outputs is not None:
+            return self._outputs[index]
+        if isinstance(index, slice):
+            return BitVector.from_bits(
+                self[i] for i in range(*index.indices(len(self)))
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("LazyOutputs index out of range")
+        cache = self._cache
+        with self._lock:
+            output = cache.get(index)
+            if output is not None:
+                cache.move_to_end(index)
+                return output
+        if self._node is not None:
+            output = _shared_bdd.evaluate(self._node, index, self._width)
+        else:
+            output = _evaluate_row(self._program, self._functions, self._width, index)
+        if profiler.enabled:
+            profiler.count("rows_evaluated", 1)
+        if self._size > 0:
+            with self._lock:
+                cache[index] = output
+                if len(cache) > self._size:
+                    cache.popitem(last=False)
+        return output
+
+    def __eq__(self, other):
+        return _outputs_equal(self, other)
+
+    def __repr__(self):
+        if self._outputs is not None:
+            return _format_bits(self._outputs)
+        return f"LazyOutputs(length={len(self)}, cached={len(self._cache)})"
+
+
+class OrderedOutputs(Sequence):
+    """
+    View of the outputs of a table with its variables arranged in a different
+    order. The index of each requested row is mapped to the index of the same
+    row of the table, such that the outputs are not copied.
+    """
+
+    __slots__ = ("_source", "_width", "_backend", "_shifts", "_outputs")
+
+    def __init__(self, source, variables, ordering, backend):
+        """
+        Creates a new OrderedOutputs of the given outputs.
+
+        Arguments:
+            source (sequence[int]): outputs of table
+            variables (list[str]): variables of table, in order
+            ordering (list[str]): variables of view, in order
+            backend (str): backend of table
+        """
+        self._source = source
+        self._width = len(variables)
+        self._backend = backend
+        last = self._width - 1
+        # Bit of index of row of view and of table of each variable
+        self._shifts = [
+            (last - i, last - variables.index(x)) for i, x in enumerate(ordering)
+        ]
+        # All outputs, once materialised
+        self._outputs = None
+
+    def materialise(self):
+        """
+        Rearranges the outputs of every row of the table, if they have not
+        already been rearranged.
+
+        Returns (BitVector or numpy.ndarray): outputs of every row of view
+        """
+        if self._outputs is None:
+            source = self._source
+            if isinstance(source, (LazyOutputs, OrderedOutputs)):
+                source = source.materialise()
+            destination = [0] * self._width
+            for view, table in self._shifts:
+                destination[table] = view
+            mask = _permute_rows(_outputs_to_mask(source), self._width, destination)
+            self._outputs = _outputs_from_mask(mask, self._width, self._backend)
+        return self._outputs
+
+    def __len__(self):
+        return 2**self._width
+
+    def __getitem__(self, index):
+        if self._outputs is not None:
+            return self._outputs[index]
+        if isinstance(index, slice):
+            return BitVector.from_bits(
+                self[i] for i in range(*index.indices(len(self)))
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("OrderedOutputs index out of range")
+        row = 0
+        for view, table in self._shifts:
+            row |= ((index >> view) & 1) << table
+        return self._source[row]
+
+    def __eq__(self, other):
+        return _outputs_equal(self, other)
+
+    def __repr__(self):
+        return _format_bits(self)
+
+
+class BDD:
+    """
+    Reduced ordered binary decision diagram (ROBDD) manager. Nodes are integers,
+    with 0 and 1 being the terminal nodes FALSE and TRUE. Every other node tests
+    the variable of its level, and has a low child (variable is 0) and a high
+    child (variable is 1) of greater level. Nodes are unique (i.e. no two nodes
+    have the same level and children) and no node has identical children, such
+    that two functions are equal if and only if they are the same node.
+
+    Programs may be built by several threads at once. Nodes are only ever
+    added, so they may be evaluated and counted while others are built.
+
+    Nodes are never reclaimed, as tables refer to them by number, so memory
+    grows with the number of distinct functions built. The results of
+    applications of operations are discarded once there are more than
+    max_cache_entries.
+
+    Operations are applied and nodes counted without recursion, such that
+    functions of any number of variables may be built.
+
+    Attributes:
+        levels (list[int]): level of each node
+        lows (list[int]): low child of each node
+        highs (list[int]): high child of each node
+        max_cache_entries (int): maximum number of results of applications of
+            operations kept
+    """
+
+    # Level of the terminal nodes, exceeding that of any variable
+    TERMINAL = float("inf")
+
+    def __init__(self, max_cache_entries=2**20):
+        """
+        Creates a new BDD containing only the terminal nodes.
+
+        Arguments:
+            max_cache_entries (int): maximum number of results of applications
+                of operations kept, of which all are discarded once exceeded
+        """
+        self.max_cache_entries = max_cache_entries
+        self.levels = [BDD.TERMINAL, BDD.TERMINAL]
+        self.lows = [0, 1]
+        self.highs = [0, 1]
+        # Unique table, mapping (level, low, high) to node
+        self._unique = {}
+        # Results of previous applications of operations
+        self._cache = {}
+        # Guards the creation of nodes by build
+        self._lock = threading.Lock()
+
+    def node(self, level, low, high):
+        """
+        Returns the node of the given level and children, creating it if it
+        does not already exist.
+
+        Arguments:
+            level (int): level of variable tested by node
+            low (int): node if variable is 0
+            high (int): node if variable is 1
+
+        Returns (int): node of given level and children
+        """
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self._unique.get(key)
+        if node is None:
+            node = len(self.levels)
+            self.levels.append(level)
+            self.lows.append(low)
+            self.highs.append(high)
+            self._unique[key] = node
+        return node
+
+    def variable(self, level):
+        """
+        Returns (int): node of function being the variable of the given level
+        """
+        return self.node(level, 0, 1)
+
+    def negate(self, u):
+        """
+        Returns (int): node of negation of function of node u
+        """
+        return self.apply("XOR", 1, u)
+
+    def apply(self, name, u, v):
+        """
+        Returns node of the function of the given operation applied to the
+        functions of the given nodes.
+
+        Arguments:
+            name (str): name of operation (AND, OR, or XOR)
+            u (int): node of first operand
+            v (int): node of second operand
+
+        Returns (int): node of result of operation
+        """
+        u, v, result = self._trivial(name, u, v)
+        if result is not None:
+            return result
+        cache = self._cache
+        if len(cache) >= self.max_cache_entries:
+            # Discard all results rather than grow without bound
+            cache.clear()
+        levels, lows, highs = self.levels, self.lows, self.highs
+        # Pairs of operands to which the operation is yet to be applied, each
+        # visited once to apply it to their children and again (once expanded)
+        # to create the node of the results, in place of recursion to a depth of
+        # the number of variables
+        stack = [(u, v, False)]
+        while stack:
+            a, b, expanded = stack.pop()
+            if not expanded and (name, a, b) in cache:
+                continue
+            level = min(levels[a], levels[b])
+            a0, a1 = (lows[a], highs[a]) if levels[a] == level else (a, a)
+            b0, b1 = (lows[b], highs[b]) if levels[b] == level else (b, b)
+            children = (self._trivial(name, a0, b0), self._trivial(name, a1, b1))
+            if expanded:
+                low, high = (
+                    cache[(name, x, y)] if result is None else result
+                    for x, y, result in children
+                )
+                cache[(name, a, b)] = self.node(level, low, high)
+            else:
+                stack.append((a, b, True))
+                for x, y, result in children:
+                    if result is None and (name, x, y) not in cache:
+                        stack.append((x, y, False))
+        return cache[(name, u, v)]
+
+    def _trivial(self, name, u, v):
+        """
+        Returns the given operands in order, with the node of the result of the
+        given operation applied to them if it is known without applying the
+        operation to their children (e.g. AND of FALSE and any node).
+
+        Arguments:
+            name (str): name of operation (AND, OR, or XOR)
+            u (int): node of first operand
+            v (int): node of second operand
+
+        Returns (tuple): lesser and greater operand, and node of result or None
+        """
+        # All operations are commutative
+        if u > v:
+            u, v = v, u
+        if v <= 1:
+            return u, v, _OPERATIONS[name](u, v)
+        if u == v:
+            return u, v, 0 if name == "XOR" else u
+        if u <= 1:
+            if name == "AND":
+                return u, v, v if u else 0
+            if name == "OR":
+                return u, v, 1 if u else v
+            if u == 0:
+                return u, v, v
+        return u, v, None
+
+    def build(self, program):
+        """
+        Returns node of the function of the given compiled program, of which
+        the level of each variable is its index.
+
+        Arguments:
+            program (list[tuple]): compiled program of expression
+
+        Returns (int): node of function of program
+        """
+        results = []
+        with self._lock:
+            for op, a, b in program:
+                if op == "VAR":
+                    results.append(self.variable(a))
+                elif op == "NOT":
+                    results.append(self.negate(results[a]))
+                else:
+                    results.append(self.apply(op, results[a], results[b]))
+        return results[-1]
+
+    def evaluate(self, u, row, width):
+        """
+        Returns value of function of node u for the given row of a table.
+
+        Arguments:
+            u (int): node of function
+            row (int): index of row, the bits of which are the values of the
+                variables of each level (e.g. for width=3, row 3 sets level 0 to
+                0, level 1 to 1 and level 2 to 1)
+            width (int): number of variables
+
+        Returns (int): value of function
+        """
+        last = width - 1
+        while u > 1:
+            if (row >> (last - self.levels[u])) & 1:
+                u = self.highs[u]
+            else:
+                u = self.lows[u]
+        return u
+
+    def count(self, u, width):
+        """
+        Returns number of combinations of values of the given number of
+        variables for which the function of node u is 1.
+
+        Arguments:
+            u (int): node of function
+            width (int): number of variables
+
+        Returns (int): number of satisfying combinations of values
+        """
+        # Number of satisfying combinations of the variables from the level of
+        # each node onwards
+        counts = {0: 0, 1: 1}
+
+        def level(x):
+            return width if x <= 1 else self.levels[x]
+
+        # Nodes yet to be counted, each counted once its children are
+        stack = [u]
+        while stack:
+            x = stack[-1]
+            if x in counts:
+                stack.pop()
+                continue
+            low, high = self.lows[x], self.highs[x]
+            uncounted = [y for y in (low, high) if y not in counts]
+            if uncounted:
+                stack.extend(uncounted)
+                continue
+            stack.pop()
+            counts[x] = (counts[low] << (level(low) - level(x) - 1)) + (
+                counts[high] << (level(high) - level(x) - 1)
+            )
+        return counts[u] << level(u)
+
+    def clear_cache(self):
+        """
+        Discards the results of previous applications of operations. Nodes are
+        unaffected.
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self):
+        """
+        Returns (int): number of nodes in BDD, including terminal nodes
+        """
+        return len(self.levels)
+
+
+class ExpressionCache:
+    """
+    Least recently used (LRU) cache of the compiled programs and outputs of
+    expressions, shared by all tables. Entries are keyed by expression, ordering
+    of variables, operators and backend, such that tables of an expression seen
+    before are neither validated nor evaluated again. The least recently used
+    entries are discarded once either the number of entries or their estimated
+    size exceeds its limit.
+    """
+
+    # Estimated size in bytes of each instruction of a compiled program
+    INSTRUCTION_SIZE = 64
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 2**20):
+        """
+        Creates a new, empty ExpressionCache.
+
+        Arguments:
+            max_entries (int): maximum number of entries, with 0 disabling the
+                cache
+            max_bytes (int): maximum estimated size in bytes of all entries
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the entry of the given key, marking it as most recently used.
+
+        Arguments:
+            key (tuple): key of entry
+
+        Returns (tuple): entry of key, or None if there is no such entry
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return item[0]
+
+    def put(self, key, entry):
+        """
+        Adds the given entry of the given key, replacing any existing entry of
+        the key and discarding the least recently used entries if the cache
+        exceeds its limits.
+
+        Arguments:
+            key (tuple): key of entry
+            entry (tuple): variables, compiled program and outputs (or None) of
+                expression
+        """
+        size = self._size(key, entry)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if self.max_entries <= 0 or size > self.max_bytes:
+                return
+            self._entries[key] = (entry, size)
+            self._bytes += size
+            self._evict()
+
+    def configure(self, max_entries=None, max_bytes=None):
+        """
+        Sets the limits of the cache, discarding the least recently used
+        entries if the cache exceeds them.
+
+        Arguments:
+            max_entries (int): maximum number of entries, or None to leave
+                unchanged
+            max_bytes (int): maximum estimated size in bytes of all entries, or
+                None to leave unchanged
+        """
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """
+        Discards all entries and resets statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def stats(self):
+        """
+        Returns statistics of the cache.
+
+        Returns (dict[str, int]): number of hits, misses and evictions, and the
+            number and estimated size in bytes of entries, with their limits
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _evict(self):
+        """
+        Discards the least recently used entries until the cache is within its
+        limits.
+        """
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            self._bytes -= self._entries.popitem(last=False)[1][1]
+            self._evictions += 1
+
+    def _size(self, key, entry):
+        """
+        Returns (int): estimated size in bytes of given entry
+        """
+        _, program, outputs = entry
+        size = len(key[0]) + len(program) * ExpressionCache.INSTRUCTION_SIZE
+        if isinstance(outputs, BitVector):
+            size += len(outputs.data)
+        elif outputs is not None:
+            size += outputs.nbytes
+        return size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Profiler:
+    """
+    Opt-in record of the wall time and number of calls of each stage of the
+    creation and use of tables, shared by all tables, along with the number of
+    rows evaluated and characters rendered. Each measurement may also be passed
+    to a callback, e.g. to export it as a metric.
+
+    Stages:
+    - validation: validating expressions
+    - variables: parsing the variables of expressions
+    - compilation: compiling expressions
+    - evaluation: evaluating the outputs of every row
+    - bdd: building binary decision diagrams
+    - rendering: rendering rows (str, get_row and render_to)
+    - sum_of_products: generating sums of products
+    - minimisation: generating minimal sums of products or products of sums
+
+    Counters:
+    - rows_evaluated: rows of which the output has been evaluated
+    - bytes_rendered: characters of rendered rows
+    """
+
+    def __init__(self):
+        """
+        Creates a new, disabled Profiler.
+        """
+        self.enabled = False
+        self._callback = None
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def enable(self, callback=None):
+        """
+        Starts recording measurements.
+
+        Arguments:
+            callback (callable): function called with the name and value of
+                each measurement, being the wall time in seconds of a call of a
+                stage (e.g. callback('validation', 0.0012)) or the increment of
+                a counter (e.g. callback('rows_evaluated', 1024)), or None
+        """
+        self._callback = callback
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stops recording measurements, retaining those already recorded.
+        """
+        self.enabled = False
+        self._callback = None
+
+    def reset(self):
+        """
+        Discards all recorded measurements.
+        """
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def record(self, stage, seconds):
+        """
+        Records a call of the given stage.
+
+        Arguments:
+            stage (str): name of stage
+            seconds (float): wall time of call
+        """
+        with self._lock:
+            calls, total = self._stages.get(stage, (0, 0.0))
+            self._stages[stage] = (calls + 1, total + seconds)
+        callback = self._callback
+        if callback is not None:
+            callback(stage, seconds)
+
+    def count(self, counter, amount):
+        """
+        Increments the given counter.
+
+        Arguments:
+            counter (str): name of counter
+            amount (int): increment of counter
+        """
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+        callback = self._callback
+        if callback is not None:
+            callback(counter, amount)
+
+    def stats(self):
+        """
+        Returns the measurements recorded so far.
+
+        e.g. {'enabled': True,
+              'stages': {'validation': {'calls': 2, 'seconds': 0.0003}, ...},
+              'counters': {'rows_evaluated': 8, 'bytes_rendered': 0}}
+
+        Returns (dict): whether profiling is enabled, number of calls and total
+            wall time in seconds of each stage, and value of each counter
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "stages": {
+                    stage: {"calls": calls, "seconds": seconds}
+                    for stage, (calls, seconds) in self._stages.items()
+                },
+                "counters": {
+                    "rows_evaluated": self._counters.get("rows_evaluated", 0),
+                    "bytes_rendered": self._counters.get("bytes_rendered", 0),
+                },
+            }
+
+
+class EquivalenceIndex:
+    """
+    Index grouping expressions into classes of equivalent expressions, being
+    those with the same outputs for every combination of inputs of the same
+    variables (e.g. 'A.B', 'B.A' and '!(!A+!B)'). Optionally, expressions are
+    also equivalent if they are equal up to a permutation (or renaming) of
+    their variables (e.g. 'A.!B', 'B.!A' and 'X.!Y').
+
+    Each expression is keyed by a fingerprint of its outputs in a canonical
+    ordering of its variables, such that adding an expression takes a single
+    lookup rather than a comparison with every class.
+    """
+
+    def __init__(self, permutations=False, backend=None):
+        """
+        Creates a new, empty EquivalenceIndex.
+
+        Arguments:
+            permutations (boolean): if true, expressions equal up to a
+                permutation of their variables are equivalent
+            backend (str): backend of tables of expressions added to index
+        """
+        self.permutations = permutations
+        self.backend = backend
+        # Index of class of each key, and expressions of each class
+        self._classes = {}
+        self._members = []
+
+    def add(self, expression):
+        """
+        Adds the given expression to the index.
+
+        Arguments:
+            expression (str or TruthTable): expression, or table of expression
+
+        Raises:
+            InvalidExpressionError: if expression is invalid
+
+        Returns (int): index of class of equivalent expressions of expression
+        """
+        table = self._table(expression)
+        key = _equivalence_key(table, self.permutations)
+        index = self._classes.setdefault(key, len(self._members))
+        if index == len(self._members):
+            self._members.append([])
+        self._members[index].append(table.expression)
+        return index
+
+    def find(self, expression):
+        """
+        Returns the index of the class of expressions equivalent to the given
+        expression, without adding it to the index.
+
+        Arguments:
+            expression (str or TruthTable): expression, or table of expression
+
+        Returns (int): index of class, or None if there is no such class
+        """
+        table = self._table(expression)
+        return self._classes.get(_equivalence_key(table, self.permutations))
+
+    def classes(self):
+        """
+        Returns (list[list[str]]): expressions of each class, in order of
+            addition of the first expression of each class
+        """
+        return [list(x) for x in self._members]
+
+    def _table(self, expression):
+        """
+        Returns (TruthTable): given table, or table of given expression
+        """
+        if isinstance(expression, TruthTable):
+            return expression
+        return TruthTable(expression, self.backend)
+
+    def __len__(self):
+        return len(self._members)
+
+
+def _format_bits(bits, limit=64):
+    """
+    Returns representation of the given sequence of bits as a list, of which
+    only the first and last elements are shown if it exceeds the given limit.
+
+    e.g. '[0, 0, 0, 1]' or '[0, 0, 0, ..., 0, 0, 1] (length=1024)'
+
+    Arguments:
+        bits (sequence[int]): bits to be represented
+        limit (int): maximum number of elements shown in full
+
+    Returns (str): representation of bits
+    """
+    if len(bits) <= limit:
+        return f"[{', '.join(str(int(x)) for x in bits)}]"
+    head = ", ".join(str(int(x)) for x in bits[: limit // 2])
+    tail = ", ".join(str(int(x)) for x in bits[len(bits) - limit // 2 :])
+    return f"[{head}, ..., {tail}] (length={len(bits)})"
+
+
+# BDD shared by all tables
+_shared_bdd = BDD()
+# Compiled programs and outputs of expressions, shared by all tables
+expression_cache = ExpressionCache()
+
+profiler = Profiler()
+
+
+def set_default_backend(backend):
+    """
+    Set the backend used by tables for which no backend is given.
+
+    Arguments:
+        backend (str): backend with which outputs are evaluated ('python',
+            'numpy', 'bdd' or 'gray')
+
+    Raises:
+        ValueError: if given backend is not one of BACKENDS
+    """
+    global _default_backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend must be one of {', '.join(BACKENDS)}")
+    _default_backend = backend
+
+
+def _resolve_backend(backend):
+    """
+    Returns the backend to be used for the given requested backend, falling back
+    to the python backend if NumPy is not installed.
+
+    Arguments:
+        backend (str): requested backend, or None for the default backend
+
+    Raises:
+        ValueError: if given backend is not one of BACKENDS
+
+    Returns (str): backend to be used
+    """
+    backend = _default_backend if backend is None else backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend must be one of {', '.join(BACKENDS)}")
+    if backend == "numpy" and _import_numpy() is None:
+        return "python"
+    return backend
+
+
+def _import_numpy():
+    """
+    Imports NumPy upon first use.
+
+    Returns (module): numpy module, or None if NumPy is not installed
+    """
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        _numpy = numpy
+    return _numpy
+
+
+@_profiled("evaluation")
+def _evaluate_outputs(program, functions, width, backend):
+    """
+    Evaluate the given compiled program for every row of a table.
+
+    Arguments:
+        program (list[tuple]): compiled program of expression
+        functions (dict[str, lambda]): functions of operators of program
+        width (int): number of variables of table
+        backend (str): backend with which outputs are evaluated
+
+    Returns (BitVector or numpy.ndarray): outputs of every row
+    """
+    if profiler.enabled:
+        profiler.count("rows_evaluated", 2**width)
+    if backend == "numpy":
+        return _evaluate_arrays(program, functions, width)
+    if backend == "gray":
+        return _evaluate_gray(program, functions, width)
+    return BitVector.from_int(_evaluate_columns(program, functions, width), 2**width)
+
+
+def _evaluate_gray(program, functions, width):
+    """
+    Evaluate the given compiled program for every row, enumerating the rows in
+    Gray code order such that the input of a single variable changes between
+    consecutive rows. The result of every instruction is kept between rows, and
+    only the instructions depending on the changed variable are re-evaluated,
+    in program order, skipping any of which no operand has changed. The output
+    of each row is stored at its natural index.
+
+    e.g. For variables A and B, the rows are enumerated in the order 0 (00),
+    1 (01), 3 (11) and 2 (10)
+
+    Arguments:
+        program (list[tuple]): compiled program of expression
+        functions (dict[str, lambda]): functions of operators of program
+        width (int): number of variables of table
+
+    Returns (BitVector): outputs of every row
+    """
+    rows = 2**width
+    last = len(program) - 1
+    # Instructions depending on each instruction, and on each variable
+    dependents = [[] for _ in program]
+    for i, (op, a, b) in enumerate(program):
+        if op != "VAR":
+            dependents[a].append(i)
+            if b is not None:
+                dependents[b].append(i)
+    affected = [set() for _ in range(width)]
+    for i, (op, a, _) in enumerate(program):
+        if op == "VAR":
+            stack = [i]
+            while stack:
+                for j in dependents[stack.pop()]:
+                    if j not in affected[a]:
+                        affected[a].add(j)
+                        stack.append(j)
+    updates = [[(j, *program[j]) for j in sorted(affected[a])] for a in range(width)]
+    leaves = [[] for _ in range(width)]
+    for i, (op, a, _) in enumerate(program):
+        if op == "VAR":
+            leaves[a].append(i)
+
+    # Results of row 0, in which every input is 0
+    values = []
+    for op, a, b in program:
+        if op == "VAR":
+            values.append(0)
+        elif op == "NOT":
+            values.append(values[a] ^ 1)
+        else:
+            values.append(functions[op](values[a], values[b]))
+    data = bytearray((rows + 7) // 8)
+    data[0] = values[last]
+
+    # Step in which the result of each instruction last changed
+    changed = [0] * len(program)
+    row = 0
+    for step in range(1, rows):
+        # Bit of row flipped in this step, being its number of trailing zeros
+        bit = (step & -step).bit_length() - 1
+        row ^= 1 << bit
+        variable = width - 1 - bit
+        for i in leaves[variable]:
+            values[i] ^= 1
+            changed[i] = step
+        for i, op, a, b in updates[variable]:
+            if changed[a] != step and (b is None or changed[b] != step):
+                continue
+            if op == "NOT":
+                value = values[a] ^ 1
+            else:
+                value = functions[op](values[a], values[b])
+            if value != values[i]:
+                values[i] = value
+                changed[i] = step
+        if values[last]:
+            data[row >> 3] |= 1 << (row & 7)
+    return BitVector(bytes(data), rows)
+
+
+def _search_rows(program, width, value, limit, ordered=True):
+    """
+    Returns rows of which the output of the given compiled program is the given
+    value, found by a depth-first search over partial assignments of the
+    variables. The program is evaluated for each partial assignment in ternary
+    logic, in which the result of an instruction is unknown (None) unless
+    decided by its known operands (e.g. AND of a 0, or OR of a 1). If the result
+    is decided, every row of the partial assignment is either a result or
+    pruned, and otherwise the next variable is assigned.
+
+    If ordered, variables are assigned in order, such that the first rows are
+    found. Otherwise, variables nearest the root of the program are assigned
+    first, as they are most likely to decide the result early.
+
+    Arguments:
+        program (list[tuple]): compiled program of expression
+        width (int): number of variables of table
+        value (int): output of rows (0 or 1)
+        limit (int): maximum number of rows
+        ordered (boolean): if true, the first rows are found
+
+    Returns (list[int]): indices of rows, in ascending order
+    """
+    if ordered:
+        order = list(range(width))
+    else:
+        # Least distance of each instruction from the final instruction
+        distances = [len(program)] * len(program)
+        distances[-1] = 0
+        for i in range(len(program) - 1, -1, -1):
+            op, a, b = program[i]
+            if op != "VAR":
+                distances[a] = min(distances[a], distances[i] + 1)
+                if b is not None:
+                    distances[b] = min(distances[b], distances[i] + 1)
+        nearest = [len(program)] * width
+        for i, (op, a, _) in enumerate(program):
+            if op == "VAR":
+                nearest[a] = min(nearest[a], distances[i])
+        order = sorted(range(width), key=lambda a: (nearest[a], a))
+    # Number of variables assigned before each variable
+    ranks = [0] * width
+    for rank, a in enumerate(order):
+        ranks[a] = rank
+
+    rows = []
+    # Number of assigned variables and their inputs, of each partial assignment
+    # yet to be searched
+    stack = [(0, 0)]
+    while stack and len(rows) < limit:
+        depth, inputs = stack.pop()
+        result = _evaluate_partial(program, ranks, depth, inputs)
+        if result is None:
+            stack.append((depth + 1, (inputs << 1) | 1))
+            stack.append((depth + 1, inputs << 1))
+        elif result == value:
+            rows.extend(
+                _assignment_rows(order, width, depth, inputs, limit - len(rows))
+            )
+    return rows if ordered else sorted(rows)
+
+
+def _assignment_rows(order, width, depth, inputs, limit):
+    """
+    Returns the rows matching a partial assignment of variables, in ascending
+    order.
+
+    Arguments:
+        order (list[int]): positions of variables in order of assignment
+        width (int): number of variables of table
+        depth (int): number of assigned variables
+        inputs (int): inputs of assigned variables, of which the most
+            significant bit is the input of the first assigned variable
+        limit (int): maximum number of rows
+
+    Returns (list[int]): indices of rows
+    """
+    base = 0
+    for rank in range(depth):
+        if (inputs >> (depth - 1 - rank)) & 1:
+            base |= 1 << (width - 1 - order[rank])
+    # Bits of index of unassigned variables, least significant first
+    free = sorted(width - 1 - a for a in order[depth:])
+    rows = []
+    for combination in range(min(2 ** len(free), limit)):
+        row = base
+        for j, bit in enumerate(free):
+            if (combination >> j) & 1:
+                row |= 1 << bit
+        rows.append(row)
+    return rows
+
+
+def _evaluate_partial(program, ranks, depth, inputs):
+    """
+    Evaluate the given compiled program for a partial assignment of its
+    variables in ternary logic, of which unknown results are None.
+
+    Arguments:
+        program (list[tuple]): compiled program of expression
+        ranks (list[int]): number of variables assigned before each variable
+        depth (int): number of assigned variables
+        inputs (int): inputs of assigned variables, of which the most
+            significant bit is the input of the first assigned variable
+
+    Returns (int): output of expression (0 or 1), or None if unknown
+    """
+    last = depth - 1
+    results = []
+    for op, a, b in program:
+        if op == "VAR":
+            rank = ranks[a]
+            results.append((inputs >> (last - rank)) & 1 if rank < depth else None)
+            continue
+        x = results[a]
+        if op == "NOT":
+            results.append(None if x is None else x ^ 1)
+            continue
+        y = results[b]
+        if op == "AND":
+            if x == 0 or y == 0:
+                results.append(0)
+            else:
+                results.append(None if x is None or y is None else 1)
+        elif op == "OR":
+            if x == 1 or y == 1:
+                results.append(1)
+            else:
+                results.append(None if x is None or y is None else 0)
+        else:
+            results.append(None if x is None or y is None else x ^ y)
+    return results[-1]
+
+
+def _generate_function(program, variables, mode, lanes, expression):
+    """
+    Generates the source of a function computing the given compiled program, of
+    which each instruction is an assignment of a local variable, and returns
+    the compiled function. See TruthTable.compile.
+
+    e.g. For expression='A.!B' in variables mode, the source is
+    def predicate(A, B):
+        _t2 = 1 ^ B
+        _t3 = A & _t2
+        return _t3
+
+    Arguments:
+        program (list[tuple]): compiled program of expression
+        variables (list[str]): variables of table
+        mode (str): mode of function ('variables', 'row' or 'mask')
+        lanes (int): number of bits of bitmasks in mask mode, or None
+        expression (str): expression of table, being the docstring of function
+
+    Returns (function): function computing program
+    """
+    # Prefix of local variables, such that none is also a parameter
+    prefix = "_t"
+    while any(x.startswith(prefix) for x in variables):
+        prefix += "_"
+    width = len(variables)
+    if mode == "row":
+        parameters = ["row"]
+    elif any(keyword.iskeyword(x) for x in variables):
+        parameters = [f"{prefix}v{i}" for i in range(width)]
+    else:
+        parameters = list(variables)
+    if mode != "mask":
+        negation = "1 ^ {}"
+    elif lanes is None:
+        negation = "~{}"
+    else:
+        negation = f"{(1 << lanes) - 1} ^ {{}}"
+    symbols = {"AND": "&", "OR": "|", "XOR": "^"}
+
+    lines = [f"def predicate({', '.join(parameters)}):"]
+    # Name of result of each instruction
+    names = []
+    inputs = {}
+    for i, (op, a, b) in enumerate(program):
+        name = f"{prefix}{i}"
+        if op == "VAR" and mode != "row":
+            names.append(parameters[a])
+            continue
+        if op == "VAR":
+            if a not in inputs:
+                inputs[a] = name
+                lines.append(f"    {name} = (row >> {width - 1 - a}) & 1")
+            names.append(inputs[a])
+            continue
+        if op == "NOT":
+            value = negation.format(names[a])
+        else:
+            value = f"{names[a]} {symbols[op]} {names[b]}"
+        lines.append(f"    {name} = {value}")
+        names.append(name)
+    lines.append(f"    return {names[-1]}")
+
+    namespace = {}
+    exec(compile("\n".join(lines), "<truthtable>", "exec"), namespace)
+    function = namespace["predicate"]
+    function.__doc__ = expression
+    return function
+
+
+def _evaluate_row(program, functions, width, row):
+    """
+    Evaluate the given compiled program for a single row.
+
+    Arguments:
+        program (list[tuple]): compiled program of expression
+        functions (dict[str, lambda]): functions of operators of program
+        width (int): number of variables of table
+        row (int): index of row, the bits of which are the inputs of the
+            variables (e.g. for variables A, B, and C, row 3 sets A=0, B=1 and
+            C=1)
+
+    Returns (int): output of expression for given row
+    """
+    last = width - 1
+    results = []
+    for op, a, b in program:
+        if op == "VAR":
+            results.append((row >> (last - a)) & 1)
+        elif op == "NOT":
+            results.append(results[a] ^ 1)
+        else:
+            results.append(functions[op](results[a], results[b]))
+    return results[-1]
+
+
+def _evaluate_columns(program, functions, width, shard_bits=0, shard=0):
+    """
+    Evaluate the given compiled program for every row at once. Each variable is
+    represented by a column mask of 2^n bits, of which bit i is the input of
+    that variable in row i (e.g. for variables A, B, and C, A=0b11110000,
+    B=0b11001100 and C=0b10101010). The operations of the program are then
+    applied to whole columns.
+
+    Optionally, only the rows of a shard of the table may be evaluated, being
+    the rows of which the most significant bits of the index are the index of
+    the shard (i.e. the first variables are constant).
+
+    Arguments:
+        program (list[tuple]): compiled program of expression
+        functions (dict[str, lambda]): functions of operators of program
+        width (int): number of variables of table
+        shard_bits (int): number of bits of index of shard
+        shard (int): index of shard
+
+    Returns (int): mask of which bit i is the output of row i (of shard)
+    """
+    rows = 2 ** (width - shard_bits)
+    last = width - 1
+    full = (1 << rows) - 1
+    columns = {}
+    results = []
+    for op, a, b in program:
+        if op == "VAR":
+            if a not in columns:
+                if a < shard_bits:
+                    bit = (shard >> (shard_bits - 1 - a)) & 1
+                    columns[a] = full if bit else 0
+                else:
+                    columns[a] = _column_mask(last - a, rows)
+            results.append(columns[a])
+        elif op == "NOT":
+            results.append(results[a] ^ full)
+        else:
+            results.append(functions[op](results[a], results[b]))
+    return results[-1]
+
+
+@_profiled("evaluation")
+def _evaluate_parallel(program, width, backend, workers):
+    """
+    Evaluate the given compiled program for every row using multiple processes.
+    The rows are divided into contiguous shards, each evaluated in a process of
+    a pool, which writes its packed outputs directly to shared memory.
+
+    Arguments:
+        program (list[tuple]): compiled program of expression
+        width (int): number of variables of table, being at least 3
+        backend (str): backend of table
+        workers (int): number of processes
+
+    Returns (BitVector or numpy.ndarray): outputs of every row
+    """
+    from concurrent.futures.process import BrokenProcessPool
+    from multiprocessing import shared_memory
+
+    global _pool
+    rows = 2**width
+    if profiler.enabled:
+        profiler.count("rows_evaluated", rows)
+    # Several shards per process, each of at least a byte of outputs
+    shard_bits = min(max(workers * 4 - 1, 1).bit_length(), width - 3)
+    memory = shared_memory.SharedMemory(create=True, size=rows // 8)
+    try:
+        pool = _worker_pool(workers)
+        shards = [
+            pool.submit(_evaluate_shard, program, width, shard_bits, shard, memory.name)
+            for shard in range(2**shard_bits)
+        ]
+        try:
+            for shard in shards:
+                shard.result()
+        except BrokenProcessPool:
+            # A pool whose processes died cannot be used again
+            with _pool_lock:
+                if _pool is pool:
+                    _pool = None
+            raise
+        data = bytes(memory.buf)
+    finally:
+        memory.close()
+        memory.unlink()
+    if backend == "numpy":
+        packed = _numpy.frombuffer(data, dtype=_numpy.uint8)
+        outputs = _numpy.unpackbits(packed, count=rows, bitorder="little")
+        outputs.flags.writeable = False
+        return outputs
+    return BitVector(data, rows)
+
+
+def _worker_pool(workers):
+    """
+    Returns the pool of processes shared by tables evaluated in parallel,
+    creating it upon first use, or replacing it if its number of processes is
+    not the given number. The pool is reused such that tables evaluated in
+    parallel do not each pay for starting and stopping processes.
+
+    Arguments:
+        workers (int): number of processes
+
+    Returns (concurrent.futures.ProcessPoolExecutor): pool of processes
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def _evaluate_shard(program, width, shard_bits, shard, name):
+    """
+    Evaluate the given compiled program for the rows of a shard of a table,
+    writing the packed outputs to the shard's section of shared memory. Invoked
+    in a process of the pool of _evaluate_parallel.
+
+    Arguments:
+        program (list[tuple]): compiled program of expression
+        width (int): number of variables of table
+        shard_bits (int): number of bits of index of shard
+        shard (int): index of shard
+        name (str): name of shared memory of packed outputs of every row
+    """
+    from multiprocessing import shared_memory
+
+    size = 2 ** (width - shard_bits) // 8
+    mask = _evaluate_columns(program, _OPERATIONS, width, shard_bits, shard)
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        memory.buf[shard * size : (shard + 1) * size] = mask.to_bytes(size, "little")
+    finally:
+        memory.close()
+
+
+def _evaluate_arrays(program, functions, width):
+    """
+    Evaluate the given compiled program for every row at once using NumPy. Each
+    variable is represented by a column of inputs packed eight rows per byte, to
+    which the operations of the program are applied with vectorised operators.
+
+    Arguments:
+        program (list[tuple]): compiled program of expression
+        functions (dict[str, lambda]): functions of operators of program
+        width (int): number of variables of table
+
+    Returns (numpy.ndarray): read-only uint8 array of which element i is the
+        output of row i
+    """
+    np = _numpy
+    rows = 2**width
+    last = width - 1
+    columns = {}
+    results = []
+    for op, a, b in program:
+        if op == "VAR":
+            if a not in columns:
+                block = 2 ** (last - a)
+                column = np.tile(
+                    np.repeat(np.array([0, 1], dtype=np.uint8), block),
+                    rows // (2 * block),
+                )
+                columns[a] = np.packbits(column, bitorder="little")
+            results.append(columns[a])
+        elif op == "NOT":
+            results.append(~results[a])
+        else:
+            results.append(functions[op](results[a], results[b]))
+    outputs = np.unpackbits(results[-1], count=rows, bitorder="little")
+    outputs.flags.writeable = False
+    return outputs
+
+
+def _outputs_equal(outputs, other):
+    """
+    Returns true if the given outputs of a lazy table or view equal the given
+    sequence. Outputs of tables (of which every element is 0 or 1) are compared
+    once materialised, and other sequences element by element, as for
+    BitVector.
+
+    Arguments:
+        outputs (LazyOutputs or OrderedOutputs): outputs of table
+        other (sequence[int]): outputs with which they are compared
+
+    Returns (boolean): true if outputs are equal, or NotImplemented if other is
+        not a sequence
+    """
+    try:
+        if len(other) != len(outputs):
+            return False
+    except TypeError:
+        return NotImplemented
+    materialised = outputs.materialise()
+    if isinstance(other, (BitVector, LazyOutputs, OrderedOutputs)):
+        if not isinstance(other, BitVector):
+            other = other.materialise()
+        return _outputs_to_mask(materialised) == _outputs_to_mask(other)
+    return all(x == y for x, y in zip(materialised, other))
+
+
+def _outputs_to_mask(outputs):
+    """
+    Returns the given outputs of a table as a mask of which bit i is the output
+    of row i.
+
+    Arguments:
+        outputs (BitVector or numpy.ndarray): outputs of every row
+
+    Returns (int): mask of outputs
+    """
+    if isinstance(outputs, BitVector):
+        return outputs.to_int()
+    packed = _numpy.packbits(outputs, bitorder="little")
+    return int.from_bytes(packed.tobytes(), "little")
+
+
+def _outputs_from_mask(mask, width, backend):
+    """
+    Returns the outputs of a table of the given width from a mask of which bit i
+    is the output of row i.
+
+    Arguments:
+        mask (int): mask of outputs
+        width (int): number of variables of table
+        backend (str): backend of table
+
+    Returns (BitVector or numpy.ndarray): outputs of every row
+    """
+    rows = 2**width
+    if backend == "numpy":
+        packed = _numpy.frombuffer(mask.to_bytes((rows + 7) // 8, "little"), "uint8")
+        outputs = _numpy.unpackbits(packed, count=rows, bitorder="little")
+        outputs.flags.writeable = False
+        return outputs
+    return BitVector.from_int(mask, rows)
+
+
+def _lift_outputs(mask, variables, target):
+    """
+    Returns the outputs of a table as the outputs of a table of more variables,
+    being the same for every combination of inputs of the additional variables.
+
+    e.g. For mask=0b1000 (A.B), variables=['A', 'B'], target=['B', 'C', 'A'],
+    returns 0b10100000
+
+    Arguments:
+        mask (int): mask of outputs of table, of which bit i is the output of
+            row i
+        variables (list[str]): variables of table, in order
+        target (list[str]): variables of table of outputs to be returned,
+            including all given variables
+
+    Returns (int): mask of outputs of table of target variables
+    """
+    width = len(target)
+    rows = 2**width
+    # Repeat outputs for every combination of the additional variables, which
+    # are then the most significant bits of each row
+    size = 2 ** len(variables)
+    while size < rows:
+        mask |= mask << size
+        size *= 2
+    # Bit of row of each target variable, for each bit of row after repetition
+    destination = [width - 1 - target.index(x) for x in reversed(variables)]
+    destination += [width - 1 - i for i, x in enumerate(target) if x not in variables]
+    return _permute_rows(mask, width, destination)
+
+
+def _permute_rows(mask, width, destination):
+    """
+    Returns the given outputs of a table with the bits of the index of each row
+    permuted, being a rearrangement of the variables of the table. Each pair of
+    bits is swapped with a single delta swap of the whole mask.
+
+    e.g. For mask=0b1100 (A of A and B), width=2, destination=[1, 0], returns
+    0b1010 (A of B and A)
+
+    Arguments:
+        mask (int): mask of outputs of table, of which bit i is the output of
+            row i
+        width (int): number of variables of table
+        destination (list[int]): bit of index of row to which each bit is moved
+
+    Returns (int): mask of outputs of rows with permuted indices
+    """
+    rows = 2**width
+    # Original bit at each bit, and current bit of each original bit
+    current = list(range(width))
+    where = list(range(width))
+    for bit in range(width):
+        p, q = sorted((destination[bit], where[bit]))
+        if p == q:
+            continue
+        # Rows of which bit p is 1 and bit q is 0 are swapped with the rows
+        # of which bit p is 0 and bit q is 1
+        lower = _column_mask(p, rows) & ~_column_mask(q, rows)
+        shift = (1 << q) - (1 << p)
+        swapped = ((mask >> shift) ^ mask) & lower
+        mask ^= swapped | (swapped << shift)
+        # Update positions of swapped original bits
+        a, b = current[p], current[q]
+        current[p], current[q] = b, a
+        where[a], where[b] = q, p
+    return mask
+
+
+def _fingerprint(width, mask):
+    """
+    Returns a digest of the given number of variables and mask of outputs of a
+    table.
+
+    Arguments:
+        width (int): number of variables of table
+        mask (int): mask of outputs of table
+
+    Returns (bytes): 16-byte digest
+    """
+    digest = hashlib.blake2b(width.to_bytes(4, "little"), digest_size=16)
+    digest.update(mask.to_bytes((2**width + 7) // 8, "little"))
+    return digest.digest()
+
+
+def _equivalence_key(table, permutations=False):
+    """
+    Returns the key of the given table in an EquivalenceIndex, being the
+    fingerprint of its outputs with its variables in sorted order, along with
+    its variables. If permutations is true, the variables are instead arranged
+    in a canonical order determined by the outputs alone.
+
+    Arguments:
+        table (TruthTable): table of expression
+        permutations (boolean): if true, tables equal up to a permutation of
+            their variables have the same key
+
+    Returns (tuple): key of table
+    """
+    width = len(table.variables)
+    mask = table._outputs_mask()
+    if permutations:
+        return (width, _fingerprint(width, _canonical_permutation(mask, width)))
+    ordering = sorted(table.variables)
+    destination = [width - 1 - ordering.index(x) for x in reversed(table.variables)]
+    mask = _permute_rows(mask, width, destination)
+    return (tuple(ordering), _fingerprint(width, mask))
+
+
+def _canonical_permutation(mask, width):
+    """
+    Returns the outputs of a table with its variables arranged in a canonical
+    order, being the same for all tables equal up to a permutation of their
+    variables.
+
+    Each variable (i.e. bit of the index of rows) has a signature invariant
+    under permutation: the number of true rows in which it is 1, and the sorted
+    numbers of true rows in which it and each other variable are 1. Variables
+    are ordered by signature, and the arrangements of each group of variables
+    of equal signature are tried, keeping the least resulting mask. Groups of
+    which the outputs are unchanged by swapping any two variables need not be
+    rearranged. If there are more than _PERMUTATION_LIMIT arrangements, only
+    the first is used, in which case tables equal up to permutation may (in
+    rare cases) have different results.
+
+    Arguments:
+        mask (int): mask of outputs of table
+        width (int): number of variables of table
+
+    Returns (int): mask of outputs in canonical order of variables
+    """
+    rows = 2**width
+    columns = [mask & _column_mask(bit, rows) for bit in range(width)]
+    signatures = [
+        (
+            bin(columns[p]).count("1"),
+            sorted(
+                bin(columns[p] & columns[q]).count("1") for q in range(width) if q != p
+            ),
+        )
+        for p in range(width)
+    ]
+    order = sorted(range(width), key=lambda p: signatures[p])
+    groups = [
+        list(group)
+        for _, group in itertools.groupby(order, key=lambda p: signatures[p])
+    ]
+
+    def swapped(p, q):
+        destination = list(range(width))
+        destination[p], destination[q] = q, p
+        return _permute_rows(mask, width, destination)
+
+    # Arrangements of each group, with symmetric groups left as they are
+    arrangements = []
+    count = 1
+    for group in groups:
+        if all(swapped(p, q) == mask for p, q in zip(group, group[1:])):
+            arrangements.append([group])
+        else:
+            arrangements.append(list(itertools.permutations(group)))
+            count *= len(arrangements[-1])
+    if count > _PERMUTATION_LIMIT:
+        arrangements = [[group] for group in groups]
+
+    best = None
+    for arrangement in itertools.product(*arrangements):
+        destination = [0] * width
+        for bit, p in enumerate(itertools.chain.from_iterable(arrangement)):
+            destination[p] = bit
+        result = _permute_rows(mask, width, destination)
+        if best is None or result < best:
+            best = result
+    return best
+
+
+def _minimise(ones, width, method):
+    """
+    Returns implicants covering the given set of rows of a table, being a
+    minimal or near-minimal sum of products of the rows. An implicant is a pair
+    (value, care), being the set of rows which agree with value in every bit of
+    care.
+
+    Arguments:
+        ones (int): mask of rows to be covered, being non-zero
+        width (int): number of variables of table
+        method (str): minimisation method ('auto', 'qm', or 'espresso')
+
+    Raises:
+        ValueError: if method is not 'auto', 'qm', or 'espresso'
+
+    Returns (list[tuple[int, int]]): implicants covering rows
+    """
+    if method not in ("auto", "qm", "espresso"):
+        raise ValueError("Method must be auto, qm, or espresso")
+    if method == "qm" or (method == "auto" and width <= _QM_MAX_VARIABLES):
+        cubes = _select_implicants(_prime_implicants(ones, width), ones, width)
+    else:
+        cubes = _expand_implicants(ones, width)
+    # Order implicants by the variables they include, earliest first
+    implicants = [(value, care) for value, care, _ in _irredundant(cubes)]
+    return sorted(implicants, key=lambda x: (-x[1], -x[0]))
+
+
+def _prime_implicants(ones, width):
+    """
+    Returns all prime implicants of the given set of rows, found by repeatedly
+    merging pairs of implicants differing in a single bit (Quine-McCluskey).
+
+    Arguments:
+        ones (int): mask of rows
+        width (int): number of variables of table
+
+    Returns (list[tuple[int, int]]): prime implicants of rows
+    """
+    care = (1 << width) - 1
+    current = {(row, care) for row in range(2**width) if (ones >> row) & 1}
+    primes = []
+    while current:
+        merged = set()
+        used = set()
+        for value, care in current:
+            remaining = care
+            while remaining:
+                bit = remaining & -remaining
+                remaining ^= bit
+                if not value & bit and (value | bit, care) in current:
+                    merged.add((value, care ^ bit))
+                    used.add((value, care))
+                    used.add((value | bit, care))
+        primes.extend(current - used)
+        current = merged
+    return primes
+
+
+def _implicant_mask(value, care, width):
+    """
+    Returns (int): mask of the rows of a table of the given width covered by the
+        given implicant
+    """
+    mask = 1 << value
+    for k in range(width):
+        if not care & (1 << k):
+            mask |= mask << (1 << k)
+    return mask
+
+
+def _select_implicants(implicants, ones, width):
+    """
+    Returns implicants covering the given set of rows, chosen from the given
+    implicants. Essential implicants (i.e. the only implicant covering some row)
+    are chosen first, followed by those covering the most uncovered rows.
+
+    Arguments:
+        implicants (list[tuple[int, int]]): implicants, together covering rows
+        ones (int): mask of rows
+        width (int): number of variables of table
+
+    Returns (list[tuple[int, int, int]]): chosen implicants and their masks
+    """
+    cubes = [(v, c, _implicant_mask(v, c, width)) for v, c in implicants]
+    # Rows covered at least once, and at least twice
+    once = twice = 0
+    for _, _, mask in cubes:
+        twice |= once & mask
+        once |= mask
+    chosen = [cube for cube in cubes if cube[2] & ~twice]
+    covered = 0
+    for _, _, mask in chosen:
+        covered |= mask
+    while covered != ones:
+        cube = max(
+            cubes,
+            key=lambda x: (bin(x[2] & ~covered).count("1"), -bin(x[1]).count("1")),
+        )
+        chosen.append(cube)
+        covered |= cube[2]
+    return chosen
+
+
+def _expand_implicants(ones, width):
+    """
+    Returns implicants covering the given set of rows, found by expanding an
+    implicant from the first uncovered row until every row is covered. Each
+    implicant is expanded by removing each variable in turn, provided it then
+    covers no rows outside the given set (Espresso-like).
+
+    Arguments:
+        ones (int): mask of rows
+        width (int): number of variables of table
+
+    Returns (list[tuple[int, int, int]]): implicants and their masks
+    """
+    zeros = ones ^ ((1 << 2**width) - 1)
+    cubes = []
+    remaining = ones
+    while remaining:
+        value = (remaining & -remaining).bit_length() - 1
+        care = (1 << width) - 1
+        mask = 1 << value
+        for k in range(width):
+            bit = 1 << k
+            # Rows of implicant with variable inverted
+            if value & bit:
+                expanded = mask | (mask >> bit)
+            else:
+                expanded = mask | (mask << bit)
+            if not expanded & zeros:
+                mask = expanded
+                care ^= bit
+                value &= ~bit
+        cubes.append((value, care, mask))
+        remaining &= ~mask
+    return cubes
+
+
+def _irredundant(cubes):
+    """
+    Returns the given implicants without any implicants of which every row is
+    covered by the others, removing implicants of the most variables first.
+
+    Arguments:
+        cubes (list[tuple[int, int, int]]): implicants and their masks
+
+    Returns (list[tuple[int, int, int]]): irredundant implicants
+    """
+    cubes = sorted(set(cubes), key=lambda x: bin(x[1]).count("1"))
+    while True:
+        # Rows covered at least once, and at least twice
+        once = twice = 0
+        for _, _, mask in cubes:
+            twice |= once & mask
+            once |= mask
+        for i in range(len(cubes) - 1, -1, -1):
+            if not cubes[i][2] & ~twice:
+                del cubes[i]
+                break
+        else:
+            return cubes
+
+
+def _join_operands(operands, symbol):
+    """
+    Returns an expression linking the given operands with the given operator,
+    parenthesised such that each subexpression has a single operator.
+
+    e.g. For operands=['A', '!B', '(C.D)'], symbol='+', returns 'A+(!B+(C.D))'
+
+    Arguments:
+        operands (list[str]): operands, of which any containing an operator
+            are parenthesised
+        symbol (str): symbol of operator
+
+    Returns (str): expression linking operands, or '' if there are none
+    """
+    if len(operands) <= 1:
+        return "".join(operands)
+    middle = len(operands) // 2
+    left = _join_operands(operands[:middle], symbol)
+    right = _join_operands(operands[middle:], symbol)
+    # Negated variables need not be parenthesised
+    left = left if _is_variable(left.lstrip("!")) else f"({left})"
+    right = right if _is_variable(right.lstrip("!")) else f"({right})"
+    return f"{left}{symbol}{right}"
+
+
+def _is_variable(text):
+    """
+    Returns (boolean): true if the given text is a single variable (i.e. a
+        letter or underscore followed by any letters, digits and underscores)
+    """
+    return text[:1] in _IDENTIFIER_START and all(
+        char in _IDENTIFIER_CHARACTERS for char in text
+    )
+
+
+def _intern(program, interned, op, a, b=None):
+    """
+    Returns the index of the given instruction in the given program, appending
+    it to the program if it is not already in it. The operands of the
+    commutative operators (AND, OR and XOR) are ordered before lookup.
+
+    Arguments:
+        program (list[tuple]): program being compiled
+        interned (dict[tuple, int]): index of each instruction in program
+        op (str): operation of instruction
+        a (int): first operand (or position of variable) of instruction
+        b (int): second operand of instruction, None if there is none
+
+    Returns (int): index of instruction in program
+    """
+    if b is not None and b < a:
+        a, b = b, a
+    instruction = (op, a, b)
+    index = interned.get(instruction)
+    if index is None:
+        index = interned[instruction] = len(program)
+        program.append(instruction)
+    return index
+
+
+def _tokenize(expression):
+    """
+    Returns the tokens of the given expression, being its variables and each of
+    its other characters.
+
+    e.g. 'x1.!(y+z)' is split into ['x1', '.', '!', '(', 'y', '+', 'z', ')']
+
+    Arguments:
+        expression (str): expression to be split
+
+    Returns (list[str]): tokens of expression
+    """
+    return _TOKENS.findall(expression)
+
+
+def _variable_names():
+    """
+    Yields variable names without limit: 'A' to 'Z', then 'AA' to 'ZZ', then
+    'AAA', and so on.
+
+    Returns (generator[str]): variable names
+    """
+    for length in itertools.count(1):
+        for letters in itertools.product(string.ascii_uppercase, repeat=length):
+            yield "".join(letters)
+
+
+def _column_mask(bit, rows):
+    """
+    Returns mask of the rows of a truth table whose index has the given bit set,
+    being the column of inputs of a single variable.
+
+    e.g. For bit=1, rows=8, returns 0b11001100
+
+    Arguments:
+        bit (int): bit of row index
+        rows (int): number of rows in table, being a power of 2 greater than
+            2^bit
+
+    Returns (int): mask of which bit i is set if bit 'bit' of i is set
+    """
+    block = 1 << bit
+    mask = ((1 << block) - 1) << block
+    width = 2 * block
+    # Repeat pattern by doubling until it covers every row
+    while width < rows:
+        mask |= mask << width
+        width *= 2
+    return mask
+
+
+def main(argv=None):
+    """
+    Command line interface. Truth tables are created for the expressions given
+    as arguments or, if there are none, for each line of the input file (or
+    standard input), and written to the output file (or standard output) in the
+    chosen format:
+    - text: each table as printed by print(table), preceded by its expression
+      if there may be more than one
+    - csv: a row of the expression, variables, outputs and any requested
+      fields of each table
+    - jsonl: a JSON object of the expression, variables, outputs and any
+      requested fields of each table
+    - binary: each table as written by TruthTable.save, one after another,
+      each beginning immediately after the outputs of the last (its length
+      being given by its header and metadata, as described by
+      TruthTable.save). TruthTable.load reads only the first table of a file.
+
+    Without worker processes, tables are written as they are rendered, such
+    that no representation of a table is held in memory in its entirety.
+
+    Invalid expressions are reported on standard error (or as the error of a
+    record of the csv and jsonl formats) without stopping the remaining
+    expressions.
+
+    e.g. python truthtable.py 'A.B'
+         python truthtable.py -i expressions.txt -f jsonl --sop --group -j 4
+
+    Arguments:
+        argv (list[str]): arguments, defaulting to sys.argv[1:]
+
+    Returns (int): exit status, being 1 if any expression was invalid
+    """
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(
+        prog="truthtable.py",
+        description="Generate truth tables of boolean expressions.",
+    )
+    parser.add_argument("expressions", nargs="*", help="boolean expressions")
+    parser.add_argument(
+        "-i", "--input", help="file of expressions, one per line ('-' for stdin)"
+    )
+    parser.add_argument("-o", "--output", help="file to which results are written")
+    parser.add_argument(
+        "-f", "--format", choices=_CLI_FORMATS, default="text", help="output format"
+    )
+    parser.add_argument("-b", "--backend", choices=BACKENDS, help="backend")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=0, help="number of worker processes"
+    )
+    parser.add_argument("--start", type=int, default=0, help="index of first row")
+    parser.add_argument("--end", type=int, help="index after last row")
+    parser.add_argument("--sop", action="store_true", help="add sum of products")
+    parser.add_argument(
+        "--minimal", action="store_true", help="add minimal sum of products"
+    )
+    parser.add_argument(
+        "--group",
+        action="store_true",
+        help="number each expression by its class of equivalent expressions",
+    )
+    parser.add_argument(
+        "--permutations",
+        action="store_true",
+        help="group expressions equal up to a permutation of their variables",
+    )
+    args = parser.parse_args(argv)
+    if args.start < 0:
+        parser.error("--start must not be negative")
+    if args.end is not None and args.end < args.start:
+        parser.error("--end must not be less than --start")
+
+    if args.expressions:
+        expressions = iter(args.expressions)
+    elif args.input not in (None, "-"):
+        expressions = open(args.input)
+    elif args.input is None and sys.stdin.isatty():
+        parser.print_usage(sys.stderr)
+        return 2
+    else:
+        expressions = sys.stdin
+    binary = args.format == "binary"
+    if args.output is not None:
+        output = open(args.output, "wb") if binary else open(args.output, "w")
+    else:
+        output = sys.stdout.buffer if binary else sys.stdout
+    headed = len(args.expressions) != 1
+    settings = (args.backend, args.format, args.start, args.end, args.sop)
+    settings += (args.minimal, args.group, args.permutations)
+
+    groups = {}
+    writer = None
+    fields = ["expression", "variables", "outputs"]
+    fields += [x for x in ("sop", "minimal", "group") if getattr(args, x)]
+    fields.append("error")
+    if args.format == "csv":
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(fields)
+    status = 0
+    try:
+        for record in _cli_records(expressions, settings, args.workers):
+            if "error" in record:
+                status = 1
+                if args.format in ("text", "binary"):
+                    sys.stderr.write(f"{record['expression']}: {record['error']}\n")
+                    continue
+            if "group" in record:
+                record["group"] = groups.setdefault(record["group"], len(groups))
+            _cli_write(output, writer, fields, args.format, record, headed)
+    finally:
+        if output not in (sys.stdout, getattr(sys.stdout, "buffer", None)):
+            output.close()
+        if expressions not in (sys.stdin,) and hasattr(expressions, "close"):
+            expressions.close()
+    return status
+
+
+def _cli_records(expressions, settings, workers):
+    """
+    Yields the record of each of the given expressions, in order, evaluated by
+    a pool of the given number of processes if there is more than one. Blank
+    lines are skipped.
+
+    Arguments:
+        expressions (iterable[str]): expressions, or lines of expressions
+        settings (tuple): settings of _cli_record
+        workers (int): number of processes
+
+    Returns (generator[dict]): record of each expression
+    """
+    expressions = (x.strip() for x in expressions)
+    expressions = (x for x in expressions if x)
+    if workers <= 1:
+        record = functools.partial(_cli_record, settings=settings, buffered=False)
+        yield from map(record, expressions)
+        return
+    record = functools.partial(_cli_record, settings=settings)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = list(itertools.islice(expressions, _CLI_BATCH_SIZE))
+            if not batch:
+                break
+            chunksize = max(1, len(batch) // (workers * 4))
+            yield from pool.map(record, batch, chunksize=chunksize)
+
+
+def _cli_record(expression, settings, buffered=True):
+    """
+    Returns the record of the truth table of the given expression, being a dict
+    of its expression and either its error, or its variables, outputs and any
+    requested fields. Invoked in a process of the pool of _cli_records, if any.
+
+    Arguments:
+        expression (str): expression of table
+        settings (tuple): backend, format, index of first and after last row,
+            whether to add the sum of products, minimal sum of products and key
+            of class of equivalent expressions, and whether expressions equal
+            up to a permutation of their variables are equivalent
+        buffered (boolean): if true, the outputs (or rendered table) are held
+            in the record, otherwise the table and range of rows are held as
+            its source, from which _cli_write writes them
+
+    Returns (dict): record of expression
+    """
+    backend, format, start, end, sop, minimal, group, permutations = settings
+    try:
+        table = TruthTable(expression, backend)
+    except InvalidExpressionError as error:
+        return {
+            "expression": expression,
+            "error": error.message,
+            "position": error.position,
+        }
+    rows = 2 ** len(table.variables)
+    end = rows if end is None else min(end, rows)
+    start = min(start, end)
+    record = {"expression": expression, "variables": table.variables}
+    if not buffered:
+        record["source"] = (table, start, end)
+        if format in ("csv", "jsonl"):
+            record["start"] = start
+            # Written by _cli_write in place of this field
+            record["outputs"] = None
+    elif format == "binary":
+        file = io.BytesIO()
+        table._write(file)
+        record["data"] = file.getvalue()
+    elif format == "text":
+        file = io.StringIO()
+        table.render_to(file, start, end)
+        record["table"] = file.getvalue()
+    else:
+        record["start"] = start
+        record["outputs"] = "".join(map(str, table.outputs[start:end]))
+    if sop:
+        record["sop"] = table.sum_of_products()
+    if minimal:
+        record["minimal"] = table.minimal_sum_of_products()
+    if group:
+        record["group"] = _equivalence_key(table, permutations)
+    return record
+
+
+def _cli_write(output, writer, fields, format, record, headed):
+    """
+    Writes the given record of an expression to the given output in the given
+    format. The outputs of a record with a source are streamed from its table,
+    rather than held in memory.
+
+    Arguments:
+        output (file): output file, being binary for the binary format
+        writer (csv.writer): writer of output for the csv format
+        fields (list[str]): fields of each row of the csv format
+        format (str): format of output
+        record (dict): record of expression
+        headed (boolean): if true, tables in the text format are preceded by
+            their expression
+    """
+    record = dict(record)
+    source = record.pop("source", None)
+    if format == "binary":
+        if source is None:
+            output.write(record["data"])
+        else:
+            source[0]._write(output)
+    elif format == "jsonl":
+        if source is None:
+            output.write(json.dumps(record) + "\n")
+        else:
+            _cli_stream(
+                output, json.dumps(dict(record, outputs=_CLI_MARKER)) + "\n", source
+            )
+    elif format == "csv":
+        record = dict(record, variables=" ".join(record.get("variables", [])))
+        if source is None:
+            writer.writerow([record.get(x, "") for x in fields])
+        else:
+            row = io.StringIO()
+            record["outputs"] = _CLI_MARKER
+            csv.writer(row, lineterminator="\n").writerow(
+                [record.get(x, "") for x in fields]
+            )
+            _cli_stream(output, row.getvalue(), source)
+    else:
+        if headed:
+            output.write(record["expression"] + "\n")
+        if source is None:
+            output.write(record["table"])
+        else:
+            table, start, end = source
+            table.render_to(output, start, end)
+        if "sop" in record:
+            output.write(f"Sum of products: {record['sop']}\n")
+        if "minimal" in record:
+            output.write(f"Minimal sum of products: {record['minimal']}\n")
+        if "group" in record:
+            output.write(f"Group: {record['group']}\n")
+        if headed:
+            output.write("\n")
+
+
+def _cli_stream(output, text, source):
+    """
+    Writes the given text of a record to the given output, with the outputs of
+    the rows of its source in place of the marker in the text. The outputs are
+    written in chunks, as for TruthTable.render_to.
+
+    Arguments:
+        output (file): output file
+        text (str): text of record, containing _CLI_MARKER (or its JSON
+            representation) once in place of its outputs
+        source (tuple): table, and index of first and after last row
+    """
+    table, start, end = source
+    marker = json.dumps(_CLI_MARKER)
+    if marker in text:
+        before, after = text.split(marker, 1)
+        before, after = before + '"', '"' + after
+    else:
+        before, after = text.split(_CLI_MARKER, 1)
+    output.write(before)
+    outputs = table.outputs
+    for i in range(start, end, _RENDER_CHUNK_ROWS):
+        output.write("".join(map(str, outputs[i : min(i + _RENDER_CHUNK_ROWS, end)])))
+    output.write(after)
+
+
+class InvalidExpressionError(Exception):
+    def __init__(self, message, position=None):
+        """
+        Arguments:
+            message (str): description of error
+            position (int): index in expression of the character at which the
+                error was found, None if not applicable
+        """
+        super().__init__(message)
+        self.message = message
+        self.position = position
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())